@@ -54,6 +54,7 @@ else:
         MdeFixUnderlinedHeadingsCommand,
         MdeGotoNextHeadingCommand,
         MdeGotoPreviousHeadingCommand,
+        MdeHeadingOutlineListener,
         MdeMatchHeadingHashesCommand,
         MdeMatchHeadingHashesDetector,
         MdeUnsavedViewNameSetter,
@@ -70,6 +71,7 @@ else:
     from .plugins.lint import (
         MdeMarkdownLintCommand,
         MdeMarkdownLintMdlCommand,
+        MdeValidateLinksCommand,
     )
     from .plugins.logging import (
         load_logger,
@@ -79,10 +81,15 @@ else:
         MdeIndentQuote,
         MdeUnindentQuote,
     )
+    from .plugins.reference_index import (
+        MdeReferenceIndexListener,
+    )
     from .plugins.references import (
         MdeConvertInlineLinksToReferencesCommand,
         MdeConvertInlineLinkToReferenceCommand,
         MdeGatherMissingLinkMarkersCommand,
+        MdeReferenceCheckUrlsCommand,
+        MdeReferenceCleanupCommand,
         MdeReferenceDeleteReferenceCommand,
         MdeReferenceJumpCommand,
         MdeReferenceJumpContextCommand,
@@ -92,6 +99,7 @@ else:
         MdeReferenceNewInlineLinkCommand,
         MdeReferenceNewReferenceCommand,
         MdeReferenceOrganizeCommand,
+        MdeReferencePopupListener,
         MdeAddNumberedReferenceDefinitionCommand,
         MdeReferenceCompletionsProvider,
     )
@@ -108,6 +116,9 @@ else:
         MdeOpenPageCommand,
         MdePrepareFromTemplateCommand,
     )
+    from .plugins.workspace_index import (
+        MdeWorkspaceIndexListener,
+    )
 
     def plugin_loaded():
         load_logger()
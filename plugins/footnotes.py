@@ -1,47 +1,241 @@
+import bisect
 import re
 
 import sublime
 
+from .text import (
+    FOOTNOTE_END_RE,
+    RegionIndex,
+    common_prefix,
+    common_suffix,
+    fenced_code_regions,
+)
 from .view import MdeTextCommand, MdeViewEventListener
 
 DEFINITION_KEY = "MarkdownEditing-footnote-definitions"
 REFERENCE_KEY = "MarkdownEditing-footnote-references"
-DEFINITION_REGEX = r"^[\t ]*\[\^([^\]]*)\]:"
-REFERENCE_REGEX = r"\[\^([^\]]*)\]"
+DEFINITION_REGEX = r"^[\t ]*\[\^([^\]\n]*)\]:"
+REFERENCE_REGEX = r"\[\^([^\]\n]*)\]"
+
+DEFINITION_RE = re.compile(DEFINITION_REGEX, re.M)
+REFERENCE_RE = re.compile(REFERENCE_REGEX)
+
+
+class FootnoteRegions(object):
+    """
+    Footnote references and definitions of a view, which are updated incrementally.
+
+    The text of the last scan is kept to find the changed part of the buffer. Only that
+    part is scanned again and spans behind it are shifted. Edits changing more than
+    `full_scan_ratio` of the buffer are handled by a full scan.
+
+    Use `FootnoteRegions.get(view)` to get regions, which are up to date.
+    """
+
+    # view id -> regions
+    trackers = {}
+
+    full_scan_ratio = 0.25
+
+    @classmethod
+    def get(cls, view):
+        """
+        Return the regions of `view`, updated to the view's current ``change_count``.
+        """
+        tracker = cls.trackers.get(view.id())
+        if tracker is None:
+            tracker = cls.trackers[view.id()] = cls()
+        tracker.update(view)
+        return tracker
+
+    @classmethod
+    def discard(cls, view):
+        cls.trackers.pop(view.id(), None)
+
+    def __init__(self):
+        self.change_count = None
+        self.text = None
+        # sorted (begin, end) tuples
+        self.references = []
+        self.definitions = []
+        # the `FootnoteModel` of the current text
+        self.model = None
+
+    def update(self, view):
+        """
+        Scan the text, which changed since the last update, and update the view's regions.
+        """
+        change_count = view.change_count()
+        if change_count == self.change_count:
+            return
+        text = view.substr(sublime.Region(0, view.size()))
+        if self.text is None:
+            self.scan(view, text)
+        else:
+            old = self.text
+            begin = common_prefix(old, text)
+            suffix = common_suffix(old, text, min(len(old), len(text)) - begin)
+            old_end = len(old) - suffix
+            end = len(text) - suffix
+            if (end - begin) > self.full_scan_ratio * len(text) or (
+                old_end - begin
+            ) > self.full_scan_ratio * len(old):
+                self.scan(view, text)
+            else:
+                self.rescan(view, text, begin, old_end, end)
+        self.change_count = change_count
+        self.model = None
+
+    def get_model(self):
+        """
+        Return the `FootnoteModel` of the last scanned text, which is built on first use.
+        """
+        if self.model is None:
+            self.model = FootnoteModel(self.text, self.references, self.definitions)
+        return self.model
+
+    def scan(self, view, text):
+        """
+        Scan the whole text.
+        """
+        self.text = text
+        self.references = [m.span() for m in REFERENCE_RE.finditer(text)]
+        self.definitions = [m.span() for m in DEFINITION_RE.finditer(text)]
+        self.add_regions(view)
+
+    def rescan(self, view, text, begin, old_end, end):
+        """
+        Scan the lines of `text` from `begin` to `end`, which replaced `begin` to `old_end`.
+
+        Footnote markers don't span lines, so only markers on changed lines can change.
+        Regions are only added to the view, if a marker was added, removed or changed.
+        Sublime Text moves the regions of other markers itself.
+        """
+        old = self.text
+        tail = old.find("\n", old_end)
+        if tail < 0:
+            tail = len(old)
+        head = text.rfind("\n", 0, begin) + 1
+        delta = len(text) - len(old)
+        changed = False
+        for name, pattern in (("references", REFERENCE_RE), ("definitions", DEFINITION_RE)):
+            spans = getattr(self, name)
+            first = bisect.bisect_left(spans, (head,))
+            last = bisect.bisect_left(spans, (tail,), first)
+            found = [m.span() for m in pattern.finditer(text, head, tail + delta)]
+            moved = [
+                (b, e) if e < begin else (b + delta, e + delta) if b > old_end else None
+                for b, e in spans[first:last]
+            ]
+            if found != moved:
+                changed = True
+            spans[first:] = found + [(b + delta, e + delta) for b, e in spans[last:]]
+        self.text = text
+        if changed:
+            self.add_regions(view)
+
+    def add_regions(self, view):
+        view.add_regions(
+            REFERENCE_KEY,
+            [sublime.Region(b, e) for b, e in self.references],
+            "",
+            "cross",
+            sublime.HIDDEN,
+        )
+        view.add_regions(
+            DEFINITION_KEY,
+            [sublime.Region(b, e) for b, e in self.definitions],
+            "",
+            "cross",
+            sublime.HIDDEN,
+        )
+
+
+class FootnoteModel(object):
+    """
+    Footnote ids of a text mapped to the regions of their markers.
+
+    A model is built once per change of a view and shared by all commands until the
+    next one. References on the line of a definition are ignored.
+    """
+
+    def __init__(self, text, references, definitions):
+        # id -> Region of the definition marker, the last one wins
+        self.definitions = {}
+        for b, e in definitions:
+            self.definitions[text[b:e].strip()[2:-2]] = sublime.Region(b, e)
+
+        # id -> Regions of references in order of appearance
+        self.references = {}
+        # begin, id and Region of all references ordered by position
+        self.starts = []
+        self.ids = []
+        self.regions = []
+        # the greatest numeric id of all references
+        self.last_number = 0
+
+        # begin and end of lines with a definition
+        lines = []
+        for b, e in definitions:
+            end = text.find("\n", e)
+            lines.append((b, len(text) if end < 0 else end))
+        for b, e in references:
+            i = bisect.bisect_right(lines, (b, len(text)))
+            if i and b < lines[i - 1][1]:
+                continue
+            id = text[b + 2 : e - 1]
+            region = sublime.Region(b, e)
+            self.references.setdefault(id, []).append(region)
+            self.starts.append(b)
+            self.ids.append(id)
+            self.regions.append(region)
+            if id.isdigit():
+                self.last_number = max(self.last_number, int(id))
+
+    def references_at(self, region):
+        """
+        Yield `(id, region)` of the references, which begin before and end after `region`
+        begins or ends, last one first.
+        """
+        i = bisect.bisect_right(self.starts, region.end())
+        while i > 0:
+            i -= 1
+            if self.regions[i].end() < region.begin():
+                break
+            yield self.ids[i], self.regions[i]
+
+    def next_reference(self, pt):
+        """
+        Return the id of the first reference beginning at or after `pt` or ``None``.
+        """
+        i = bisect.bisect_left(self.starts, pt)
+        return self.ids[i] if i < len(self.ids) else None
+
+
+def get_footnote_model(view):
+    return FootnoteRegions.get(view).get_model()
 
 
 def get_footnote_references(view):
-    ids = {}
-    for ref in view.get_regions(REFERENCE_KEY):
-        if not re.match(DEFINITION_REGEX, view.substr(view.line(ref))):
-            id = view.substr(ref)[2:-1]
-            if id in ids:
-                ids[id].append(ref)
-            else:
-                ids[id] = [ref]
-    return ids
+    """
+    Return the shared ``{id: [Region]}`` dictionary of references, which must not be modified.
+    """
+    return get_footnote_model(view).references
 
 
 def get_footnote_definition_markers(view):
-    ids = {}
-    for defn in view.get_regions(DEFINITION_KEY):
-        id = view.substr(defn).strip()[2:-2]
-        ids[id] = defn
-    return ids
+    """
+    Return the shared ``{id: Region}`` dictionary of definitions, which must not be modified.
+    """
+    return get_footnote_model(view).definitions
 
 
 def get_footnote_identifiers(view):
-    ids = list(get_footnote_references(view).keys())
-    ids.sort()
-    return ids
+    return sorted(get_footnote_references(view))
 
 
 def get_last_footnote_marker(view):
-    ids = sorted([int(a) for a in get_footnote_identifiers(view) if a.isdigit()])
-    if len(ids):
-        return int(ids[-1])
-    else:
-        return 0
+    return get_footnote_model(view).last_number
 
 
 def get_next_footnote_marker(view):
@@ -54,33 +248,122 @@ def is_footnote_definition(view):
 
 
 def is_footnote_reference(view):
-    refs = view.get_regions(REFERENCE_KEY)
-    for ref in refs:
-        if ref.contains(view.sel()[0]):
-            return True
-    return False
+    sel = view.sel()[0]
+    return any(ref.contains(sel) for _, ref in get_footnote_model(view).references_at(sel))
+
+
+def reorganize_footnotes(text, renumber=False, excluded=None):
+    """
+    Move all footnote definitions to the end of `text`, sorted by first reference.
+
+    Definitions including their indented paragraphs are parsed in a single pass.
+    Footnotes are ordered by their first reference in the document, followed by those
+    referenced from other footnotes only and finally unreferenced ones. Footnotes in
+    code are neither moved nor renumbered.
+
+    :param text:      The markdown text
+    :param renumber:  Whether to rename all footnotes to ``1..n`` in that order
+    :param excluded:  A `RegionIndex` of code, defaults to the result of `fenced_code_regions()`
+
+    :returns:         The reorganized text
+    """
+    text = text.rstrip()
+    if excluded is None:
+        excluded = fenced_code_regions(text)
+    matches = [m for m in DEFINITION_RE.finditer(text) if not excluded.contains(m.start(1))]
+
+    # (id, begin, end) of definitions with body in order of appearance
+    spans = []
+    for i, m in enumerate(matches):
+        # a body ends at the next definition at the latest
+        limit = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        spans.append((m.group(1), m.start(), FOOTNOTE_END_RE.search(text, m.end(), limit).end()))
+
+    # references outside of code, the markers of definitions not included
+    references = []
+    markers = set(m.start(1) - 2 for m in matches)
+    for m in REFERENCE_RE.finditer(text):
+        if m.start() not in markers and not excluded.contains(m.start()):
+            references.append(m)
+
+    # references of the content first, then those of bodies
+    ids = []
+    bodies = []
+    begins = [begin for _, begin, _ in spans]
+    for m in references:
+        i = bisect.bisect_right(begins, m.start()) - 1
+        (bodies if i >= 0 and m.start() < spans[i][2] else ids).append(m.group(1))
+    ids += bodies
+    ids += [id for id, _, _ in spans]
+    order = []
+    seen = set()
+    for id in ids:
+        if id not in seen:
+            seen.add(id)
+            order.append(id)
+
+    if renumber:
+        numbers = {id: str(i) for i, id in enumerate(order, 1)}
+        replacements = [m.span() + ("[^%s]" % numbers[m.group(1)],) for m in references]
+        replacements += [
+            (m.start(1) - 2, m.end(1) + 1, "[^%s]" % numbers[m.group(1)]) for m in matches
+        ]
+        replacements.sort()
+    else:
+        replacements = []
+    starts = [begin for begin, _, _ in replacements]
+
+    def substr(begin, end):
+        """Return `text[begin:end]` with references replaced, if renumbering."""
+        pieces = []
+        pos = begin
+        for i in range(bisect.bisect_left(starts, begin), bisect.bisect_left(starts, end)):
+            b, e, replacement = replacements[i]
+            pieces.append(text[pos:b])
+            pieces.append(replacement)
+            pos = e
+        pieces.append(text[pos:end])
+        return "".join(pieces)
+
+    notes = {}
+    pieces = []
+    pos = 0
+    for id, begin, end in spans:
+        notes.setdefault(id, []).append(substr(begin, end).strip())
+        pieces.append(substr(pos, begin))
+        pos = end
+    pieces.append(substr(pos, len(text)))
+    content = "".join(pieces).rstrip()
+
+    return content + "".join("\n\n " + note for id in order for note in notes.get(id, ()))
 
 
-def strip_trailing_whitespace(view, edit):
-    tws = view.find(r"\s+\Z", 0)
-    if tws:
-        view.erase(edit, tws)
+class MdeMarkFootnotesListener(MdeViewEventListener):
+    """
+    Track footnotes, once no modification happened for `update_delay` milliseconds.
 
+    Commands don't need to wait for it as they update regions and model on demand.
+    Updates run on the main thread only, as commands share the same `FootnoteRegions`.
+    """
+
+    update_delay = 200
 
-class MdeMarkFootnotesListener(MdeViewEventListener):
     def update_footnote_data(self):
-        self.view.add_regions(
-            REFERENCE_KEY, self.view.find_all(REFERENCE_REGEX), "", "cross", sublime.HIDDEN
-        )
-        self.view.add_regions(
-            DEFINITION_KEY, self.view.find_all(DEFINITION_REGEX), "", "cross", sublime.HIDDEN
-        )
+        FootnoteRegions.get(self.view).get_model()
 
     def on_load(self):
         self.update_footnote_data()
 
     def on_modified_async(self):
-        self.update_footnote_data()
+        change_count = self.view.change_count()
+        sublime.set_timeout(lambda: self.on_idle(change_count), self.update_delay)
+
+    def on_idle(self, change_count):
+        if self.view.is_valid() and self.view.change_count() == change_count:
+            self.update_footnote_data()
+
+    def on_close(self):
+        FootnoteRegions.discard(self.view)
 
 
 class MdeGatherMissingFootnotesCommand(MdeTextCommand):
@@ -130,23 +413,21 @@ class MdeInsertFootnoteCommand(MdeTextCommand):
 
 class MdeGotoFootnoteDefinitionCommand(MdeTextCommand):
     def run(self, edit):
-        defs = get_footnote_definition_markers(self.view)
-        regions = self.view.get_regions(REFERENCE_KEY)
+        model = get_footnote_model(self.view)
+        defs = model.definitions
 
         sel = self.view.sel()
         if len(sel) == 1:
             target = None
             selreg = sel[0]
 
-            for region in regions:
+            for id, region in model.references_at(selreg):
                 if selreg.intersects(region):
-                    target = self.view.substr(region)[2:-1]
+                    target = id
+                    break
             if not target:
-                try:
-                    target = self.view.substr(self.view.find(REFERENCE_REGEX, sel[-1].end()))[2:-1]
-                except Exception:
-                    pass
-            if target:
+                target = model.next_reference(sel[-1].end())
+            if target in defs:
                 self.view.sel().clear()
                 self.view.sel().add(defs[target])
                 self.view.show(defs[target])
@@ -182,26 +463,22 @@ class MdeSwitchToFromFootnoteCommand(MdeTextCommand):
 
 
 class MdeSortFootnotesCommand(MdeTextCommand):
-    def run(self, edit):
-        strip_trailing_whitespace(self.view, edit)
-        defs = get_footnote_definition_markers(self.view)
-        notes = {}
-        erase = []
-        keyorder = map(lambda x: self.view.substr(x)[2:-1], self.view.get_regions(REFERENCE_KEY))
-        keys = []
-        for r in keyorder:
-            if r not in keys:
-                keys.append(r)
-
-        for (key, item) in defs.items():
-            fnend = self.view.find(r"(\s*\Z|\n\s*\n(?!\ {4,}))", item.end())
-            fnreg = sublime.Region(item.begin(), fnend.end())
-            notes[key] = self.view.substr(fnreg).strip()
-            erase.append(fnreg)
-        erase.sort()
-        erase.reverse()
-        for reg in erase:
-            self.view.erase(edit, reg)
-
-        for key in keys:
-            self.view.insert(edit, self.view.size(), "\n\n " + notes[key])
+    """
+    Sort footnote definitions by first reference, optionally renumbering them.
+
+    The result is applied as a single replacement of the changed part of the buffer.
+    """
+
+    def run(self, edit, renumber=False):
+        view = self.view
+        text = view.substr(sublime.Region(0, view.size()))
+        excluded = RegionIndex((r.begin(), r.end()) for r in view.find_by_selector("markup.raw"))
+        result = reorganize_footnotes(text, renumber, excluded)
+        if result != text:
+            begin = common_prefix(text, result)
+            suffix = common_suffix(text, result, min(len(text), len(result)) - begin)
+            view.replace(
+                edit,
+                sublime.Region(begin, len(text) - suffix),
+                result[begin : len(result) - suffix],
+            )
@@ -1,6 +1,8 @@
+import bisect
 import re
 import sublime
 
+from ..text import RegionIndex, common_prefix, common_suffix
 from ..view import MdeViewEventListener
 
 HEADINGS_RE = re.compile(
@@ -15,23 +17,138 @@ HEADINGS_RE = re.compile(
 )
 
 
-def all_headings(view, start=0, end=None):
-    if end is None:
-        end = view.size()
-    text = view.substr(sublime.Region(start, end))
-    for m in HEADINGS_RE.finditer(text):
-        title_begin = start + m.start()
-        title_end = start + m.end()
+class HeadingOutline(object):
+    """
+    The headings of a view as sorted `(begin, end, level)` tuples.
+
+    The text of the last parse is kept to find the part of the buffer, which changed
+    since. Only the text between the nearest unchanged headings around it is parsed
+    again and headings behind it are shifted. Front matter and code blocks are
+    excluded by a single `find_by_selector()` call per change.
+
+    Use `HeadingOutline.get(view)` to get an outline, which is up to date.
+    """
+
+    # view id -> outline
+    outlines = {}
+
+    @classmethod
+    def get(cls, view):
+        """
+        Return the outline of `view`, updated to the view's current ``change_count``.
+        """
+        outline = cls.outlines.get(view.id())
+        if outline is None:
+            outline = cls.outlines[view.id()] = cls()
+        outline.update(view)
+        return outline
+
+    @classmethod
+    def discard(cls, view):
+        cls.outlines.pop(view.id(), None)
+
+    def __init__(self):
+        self.change_count = None
+        self.text = None
+        # all matches of HEADINGS_RE, including those in code blocks
+        self.candidates = []
+        # the candidates outside of front matter and code blocks
+        self.headings = []
+
+    def update(self, view):
+        """
+        Parse the text, which changed since the last update.
+        """
+        change_count = view.change_count()
+        if change_count == self.change_count:
+            return
+        text = view.substr(sublime.Region(0, view.size()))
+        if self.text is None:
+            self.candidates = [self.heading(m) for m in HEADINGS_RE.finditer(text)]
+        else:
+            begin = common_prefix(self.text, text)
+            suffix = common_suffix(self.text, text, min(len(self.text), len(text)) - begin)
+            self.reparse(text, begin, len(self.text) - suffix, len(text) - suffix)
+        self.text = text
+        self.change_count = change_count
+
+        raw = RegionIndex((r.begin(), r.end()) for r in view.find_by_selector("markup.raw"))
+        candidates = self.candidates
+        headings = []
+        i = 0
+        for begin, end in zip(raw.begins, raw.ends):
+            j = bisect.bisect_left(candidates, (begin,), i)
+            headings.extend(candidates[i:j])
+            i = bisect.bisect_left(candidates, (end,), j)
+        headings.extend(candidates[i:])
+        self.headings = headings
+
+    def reparse(self, text, begin, old_end, end):
+        """
+        Parse `text` from `begin` to `end`, which replaced `begin` to `old_end` of the old text.
+
+        A heading spans up to two lines, so parsing starts at the line in front of the
+        changed one or the heading it is part of and continues until the first line
+        behind the change, which is not part of an old or new heading.
+        """
+        candidates = self.candidates
+        delta = len(text) - len(self.text)
+        line = text.rfind("\n", 0, begin)
+        head = text.rfind("\n", 0, max(line, 0)) + 1
+        first = bisect.bisect_left(candidates, (head,))
+        if first > 0 and candidates[first - 1][1] >= head:
+            first -= 1
+            head = candidates[first][0]
+
+        last = first
+        stop = end
+        found = []
+        matches = HEADINGS_RE.finditer(text, head)
+        while True:
+            while last < len(candidates) and candidates[last][0] + delta <= stop:
+                stop = max(stop, candidates[last][1] + delta)
+                last += 1
+            m = next(matches, None)
+            if m is None or m.start() > stop:
+                break
+            found.append(self.heading(m))
+            stop = max(stop, m.end())
+
+        candidates[first:] = found + [(b + delta, e + delta, l) for b, e, l in candidates[last:]]
+
+    @staticmethod
+    def heading(m):
+        """
+        Return the `(begin, end, level)` tuple of a match of `HEADINGS_RE`.
+        """
         if m.group(2):
             # ATX headings use group 2 (heading) and 3 (leading hashes)
             level = m.end(2) - m.start(2)
         else:
             # SETEXT headings use group 4 (text) and 5 (underlines)
-            level = 2 if text[m.start(5)] == "-" else 1
-        # ignore front matter and raw code blocks
-        if view.match_selector(title_begin, "- markup.raw"):
-            yield (title_begin, title_end, level)
-    return None
+            level = 2 if m.group(5)[0] == "-" else 1
+        return (m.start(), m.end(), level)
+
+    def within(self, start, end):
+        """
+        Return the headings located between `start` and `end`.
+        """
+        i = bisect.bisect_left(self.headings, (start,))
+        j = bisect.bisect_left(self.headings, (end,), i)
+        while j > i and self.headings[j - 1][1] > end:
+            j -= 1
+        return self.headings[i:j]
+
+
+def all_headings(view, start=0, end=None):
+    """
+    Return the `(begin, end, level)` tuples of all headings between `start` and `end`.
+
+    Front matter and code blocks are ignored.
+    """
+    if end is None:
+        end = view.size()
+    return HeadingOutline.get(view).within(start, end)
 
 
 def first_heading_text(view):
@@ -64,3 +181,10 @@ class MdeUnsavedViewNameSetter(MdeViewEventListener):
         if len(name) > self.MAX_NAME:
             name = name[: self.MAX_NAME] + "…"
         self.view.set_name(name)
+
+
+class MdeHeadingOutlineListener(MdeViewEventListener):
+    """Drop the heading outline of closed views."""
+
+    def on_close(self):
+        HeadingOutline.discard(self.view)
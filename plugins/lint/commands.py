@@ -0,0 +1,507 @@
+import bisect
+import collections
+import hashlib
+import json
+import os
+import sublime
+import subprocess
+import threading
+import time
+
+from ..text import RegionIndex
+from ..view import MdeTextCommand
+from .core import (
+    FIX_PASSES,
+    RULES_VERSION,
+    Document,
+    Linter,
+    format_result,
+    format_stats,
+    line_starts,
+    view_settings,
+)
+from .links import Resolver, check_links
+
+
+def config_file_stats(arguments):
+    """
+    Return the modification time and size of each configuration file mdl reads.
+
+    These are the files passed by ``-c``/``--config`` and ``-s``/``--style`` or
+    ``~/.mdlrc`` by default, so editing them invalidates cached results.
+
+    :param arguments:  The additional command line arguments of mdl
+
+    :returns:          A list of `[path, mtime, size]` lists, with ``None`` for missing files
+    """
+    paths = []
+    options = ("-c", "--config", "-s", "--style")
+    for i, arg in enumerate(arguments):
+        name, sep, value = arg.partition("=")
+        if sep and name in options:
+            paths.append(value)
+        elif arg in options and i + 1 < len(arguments):
+            paths.append(arguments[i + 1])
+        elif arg[:2] in ("-c", "-s") and len(arg) > 2 and not arg.startswith("--"):
+            paths.append(arg[2:])
+    if not any(arg.startswith(("-c", "--config")) for arg in arguments):
+        paths.append("~/.mdlrc")
+
+    stats = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        try:
+            st = os.stat(path)
+            stats.append([path, st.st_mtime, st.st_size])
+        except OSError:
+            stats.append([path, None, None])
+    return stats
+
+
+class MdeMarkdownLintMdlCommand(MdeTextCommand):
+    """
+    Run markdownlint's `mdl` on the current view.
+
+    The external process runs in a worker thread, so the UI doesn't freeze while Ruby starts up.
+    Each run gets a generation number per view. A run is killed as soon as a newer one is started,
+    the buffer is modified or the configured timeout expires. Results are posted to the output
+    panel only if the view's ``change_count`` still matches the one the run was started for.
+    """
+
+    # view id -> generation of the latest requested run
+    generations = {}
+    lock = threading.Lock()
+
+    # seconds between checks of a running process
+    poll_interval = 0.1
+
+    def run(self, edit):
+        is_windows = sublime.platform() == "windows"
+
+        mdl_config = self.view.settings().get("mde.lint", {}).get("mdl", {})
+        sublime.status_message("Linting file...")
+        text_content = self.view.substr(sublime.Region(0, self.view.size()))
+        text_content = text_content.encode("utf-8")
+
+        executable_name = mdl_config.get("executable")
+        if not executable_name:
+            executable_name = "mdl.bat" if is_windows else "mdl"
+
+        with self.lock:
+            generation = self.generations.get(self.view.id(), 0) + 1
+            self.generations[self.view.id()] = generation
+
+        persist = self.view.settings().get("mde.lint", {}).get("persistent_cache", False)
+        key = result_cache.key(
+            "mdl",
+            hashlib.sha1(text_content).hexdigest(),
+            mdl_config,
+            config_file_stats(mdl_config.get("additional_arguments", [])),
+        )
+        result = result_cache.get(key, persist)
+        if result is not None:
+            self.show_result(result, "", generation, self.view.change_count())
+            return
+
+        thread = threading.Thread(
+            target=self.lint,
+            args=(
+                [executable_name] + mdl_config.get("additional_arguments", []),
+                text_content,
+                mdl_config.get("timeout", 30),
+                generation,
+                self.view.change_count(),
+                key,
+                persist,
+            ),
+        )
+        thread.daemon = True
+        thread.start()
+
+    def is_current(self, generation, change_count):
+        """
+        Check whether a run still belongs to the latest request and the unmodified buffer.
+
+        :param generation:    The generation number of the run.
+        :param change_count:  The view's change count at the time the run was started.
+
+        :returns: True if results of the run are still valid.
+        """
+        return (
+            self.generations.get(self.view.id()) == generation
+            and self.view.is_valid()
+            and self.view.change_count() == change_count
+        )
+
+    def lint(self, cmd, text_content, timeout, generation, change_count, key, persist):
+        """
+        Run mdl in a worker thread and post its results to the main thread.
+
+        :param cmd:           The command line to execute.
+        :param text_content:  The utf-8 encoded content passed to mdl via stdin.
+        :param timeout:       The number of seconds after which mdl is killed.
+        :param generation:    The generation number of the run.
+        :param change_count:  The view's change count at the time the run was started.
+        :param key:           The key to cache the result with.
+        :param persist:       Whether to persist the result in the cache directory.
+        """
+        try:
+            startupinfo = None
+            if sublime.platform() == "windows":
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                startupinfo.wShowWindow = subprocess.SW_HIDE
+
+            process = subprocess.Popen(
+                cmd,
+                bufsize=1024 * 1024 + len(text_content),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                startupinfo=startupinfo,
+            )
+        except OSError as e:
+            print(e)
+            sublime.set_timeout(
+                lambda: sublime.error_message(
+                    "It looks like markdownlint is not installed.\n"
+                    "Please make sure that it is installed and globally accessible as `mdl`."
+                )
+            )
+            return
+
+        deadline = time.time() + timeout
+        stdin = text_content
+        while True:
+            try:
+                stdout, stderr = process.communicate(stdin, timeout=self.poll_interval)
+                break
+            except subprocess.TimeoutExpired:
+                # input has been passed on the first call already
+                stdin = None
+                if not self.is_current(generation, change_count):
+                    self.kill(process)
+                    return
+                if time.time() > deadline:
+                    self.kill(process)
+                    sublime.set_timeout(
+                        lambda: sublime.status_message(
+                            "MarkdownLint: mdl timed out after %s seconds" % timeout
+                        )
+                    )
+                    return
+
+        if stderr:
+            result = False
+            error = self.read_result(stderr)
+        else:
+            result = self.read_result(stdout)
+            error = ""
+            result_cache.put(key, result, persist)
+
+        sublime.set_timeout(lambda: self.show_result(result, error, generation, change_count))
+
+    def kill(self, process):
+        process.kill()
+        process.wait()
+        # don't wait for children, which may still hold the pipes open
+        process.stdout.close()
+        process.stderr.close()
+
+    def show_result(self, result, error, generation, change_count):
+        if not self.is_current(generation, change_count):
+            return
+
+        try:
+            if error:
+                outputtxt = error
+            else:
+                outputtxt = result
+                sublime.status_message("MarkdownLint: %d error(s) found" % len(result.split("\n")))
+
+            window = self.view.window() or sublime.active_window()
+            if outputtxt:
+                output = window.create_output_panel("mde")
+                output.run_command("insert", {"characters": outputtxt})
+                window.run_command("show_panel", {"panel": "output.mde"})
+            else:
+                sublime.status_message("MarkdownLint: no errors found")
+                window.destroy_output_panel("mde")
+
+        except Exception as e:
+            print(e)
+
+    def read_result(self, stdout):
+        r = str(stdout, encoding="utf-8")
+        return r.strip().replace("\r", "").replace("(stdin):", "")
+
+
+class ResultCache(object):
+    """
+    A least recently used cache of lint results.
+
+    Results are keyed by a hash of everything they depend on, so they can be shared by all views
+    and survive closing and reopening a file. Entries can optionally be persisted as json files
+    in the package's cache directory.
+    """
+
+    def __init__(self, size=32):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        """
+        Create a cache key from json serializable `parts`.
+
+        :param parts:  The content and settings a result depends on
+
+        :returns:      A hex digest identifying the parts
+        """
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def path():
+        return os.path.join(sublime.cache_path(), "MarkdownEditing", "lint")
+
+    def get(self, key, persist=False):
+        """
+        Look up a result.
+
+        :param key:      The key as returned by `key()`
+        :param persist:  Whether to look for a persisted result on a miss
+
+        :returns:        The cached result or None
+        """
+        with self.lock:
+            try:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            except KeyError:
+                pass
+
+        if persist:
+            try:
+                with open(os.path.join(self.path(), key + ".json"), encoding="utf-8") as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self.put(key, value)
+            return value
+
+        return None
+
+    def put(self, key, value, persist=False):
+        """
+        Store a json serializable result and evict the least recently used ones.
+
+        :param key:      The key as returned by `key()`
+        :param value:    The result to store
+        :param persist:  Whether to also write the result to the cache directory
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+        if persist:
+            path = self.path()
+            try:
+                os.makedirs(path, exist_ok=True)
+                with open(os.path.join(path, key + ".json"), "w", encoding="utf-8") as f:
+                    json.dump(value, f)
+                # os.scandir() is not available in the python 3.3 plugin host
+                names = [os.path.join(path, n) for n in os.listdir(path) if n.endswith(".json")]
+                files = sorted((os.stat(name).st_mtime, name) for name in names)
+                for _, file_name in files[: -self.size * 8]:
+                    os.remove(file_name)
+            except OSError as e:
+                print(e)
+
+
+result_cache = ResultCache()
+
+
+class ViewDocument(Document):
+    """
+    A lint document backed by a view.
+    """
+
+    def __init__(self, view):
+        super().__init__(view.substr(sublime.Region(0, view.size())), view.settings())
+        self.change_count = view.change_count()
+        self.view = view
+        self.regions = {}
+
+    def find_by_selector(self, selector):
+        regions = self.regions.get(selector)
+        if regions is None:
+            regions = self.regions[selector] = [
+                (r.begin(), r.end()) for r in self.view.find_by_selector(selector)
+            ]
+        return regions
+
+
+class MdeMarkdownLintCommand(MdeTextCommand):
+    """
+    Lint the current view.
+
+    Results are listed in the output panel and marked in the view by one set of regions per rule.
+    Region sets are only updated if they differ from those of the previous run.
+    """
+
+    region_flags = sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE | sublime.DRAW_SQUIGGLY_UNDERLINE
+
+    fix_passes = FIX_PASSES
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.linter = Linter()
+        self.region_keys = set()
+
+    def run(self, edit, incremental=None, profile=None, fix=False):
+        """
+        :param incremental:  Whether to re-check only the blocks changed since the last run,
+                             defaults to `mde.lint.incremental`
+        :param profile:      Whether to print statistics per rule below the results,
+                             either `"table"` or `"json"`, defaults to `mde.lint.profile`
+        :param fix:          Whether to fix all errors, which can be fixed automatically
+        """
+        document = ViewDocument(self.view)
+        text = document.text
+        st = self.view.settings().get("mde.lint", {})
+        if profile is None:
+            profile = st.get("profile", False)
+        persist = st.get("persistent_cache", False)
+        key = result_cache.key(
+            RULES_VERSION,
+            hashlib.sha1(text.encode("utf-8")).hexdigest(),
+            {k: v for k, v in st.items() if k not in ("mdl", "profile")},
+            view_settings(document),
+            [document.find_by_selector(s) for s in (Linter.frontmatter, Linter.scope_block)],
+        )
+        # profiling requires rules to run
+        result = None if profile else result_cache.get(key, persist)
+        if result is None:
+            if incremental is None:
+                incremental = st.get("incremental", False)
+            result = self.linter.run(document, st, incremental, bool(profile))
+            result_cache.put(key, result, persist)
+
+        fixed = 0
+        # fixes may reveal new errors, e.g. expanded tabs may become trailing spaces
+        for _ in range(self.fix_passes if fix else 0):
+            fixes = self.linter.fixes(document, result, st)
+            if not fixes:
+                break
+            for begin, end, replacement in reversed(fixes):
+                self.view.replace(edit, sublime.Region(begin, end), replacement)
+            fixed += len(fixes)
+            document = ViewDocument(self.view)
+            text = document.text
+            result = self.linter.run(document, st)
+
+        starts = line_starts(text)
+        self.update_regions(result if st.get("show_regions", True) else (), starts, len(text))
+
+        lines = format_result(text, result, starts)
+        if profile:
+            if lines:
+                lines.append("")
+            if profile == "json":
+                lines.append(json.dumps(self.linter.stats, indent=4, sort_keys=True))
+            else:
+                lines.extend(format_stats(self.linter.stats))
+
+        window = self.view.window() or sublime.active_window()
+        if fixed:
+            sublime.status_message(
+                "MarkdownLint: %d error(s) fixed, %d error(s) found" % (fixed, len(result))
+            )
+        elif len(result) > 0:
+            sublime.status_message("MarkdownLint: %d error(s) found" % len(result))
+        else:
+            sublime.status_message("MarkdownLint: no errors found")
+        if lines:
+            outputtxt = "".join(line + "\n" for line in lines)
+            output = window.find_output_panel("mde")
+            if output is None or output.substr(sublime.Region(0, output.size())) != outputtxt:
+                output = window.create_output_panel("mde")
+                output.run_command("insert", {"characters": outputtxt})
+            window.run_command("show_panel", {"panel": "output.mde"})
+        else:
+            window.destroy_output_panel("mde")
+
+    def update_regions(self, result, starts, size):
+        """
+        Mark lint errors from the offset of each error to the end of its line.
+
+        :param result:  The `(offset, rule, detail)` tuples returned by `Linter.run()`
+        :param starts:  The line offsets of the linted text as returned by `line_starts()`
+        :param size:    The size of the linted text
+        """
+        regions = {}
+        for pt, rule, _ in result:
+            row = bisect.bisect_right(starts, pt)
+            end = starts[row] - 1 if row < len(starts) else size
+            key = "mde.lint." + rule.split(" ", 1)[0].lower()
+            regions.setdefault(key, []).append(sublime.Region(pt, max(pt, end)))
+
+        for key in self.region_keys - regions.keys():
+            self.view.erase_regions(key)
+        for key, value in regions.items():
+            if self.view.get_regions(key) != value:
+                self.view.add_regions(key, value, "region.orangish", "dot", self.region_flags)
+        self.region_keys = set(regions)
+
+
+class MdeValidateLinksCommand(MdeTextCommand):
+    """
+    Find relative links to missing files or anchors in the current view.
+
+    Broken links are listed in the output panel and marked in the view. Directory listings
+    and anchors of linked documents are cached by modification time and shared by all views.
+
+    Links are located by `check_links()` instead of the view's reference index, which
+    neither keeps the positions of destinations nor knows inline links. This way the
+    command reports exactly what the headless validator reports for the saved file.
+    Only code and front matter are taken from the view's scopes.
+    """
+
+    region_flags = sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE | sublime.DRAW_SQUIGGLY_UNDERLINE
+
+    resolver = Resolver()
+
+    def run(self, edit):
+        text = self.view.substr(sublime.Region(0, self.view.size()))
+        excluded = RegionIndex(
+            (r.begin(), r.end()) for r in self.view.find_by_selector("markup.raw, meta.frontmatter")
+        )
+        file_name = self.view.file_name()
+        root = None
+        window = self.view.window() or sublime.active_window()
+        if file_name:
+            for folder in window.folders():
+                if file_name.startswith(os.path.join(folder, "")):
+                    root = folder
+                    break
+        result = check_links(text, file_name, self.resolver, excluded, root)
+
+        self.view.add_regions(
+            "mde.links",
+            [sublime.Region(pt, pt + len(destination)) for pt, _, destination in result],
+            "region.orangish",
+            "dot",
+            self.region_flags,
+        )
+        if result:
+            sublime.status_message("Link validation: %d broken link(s) found" % len(result))
+            outputtxt = "".join(line + "\n" for line in format_result(text, result))
+            output = window.create_output_panel("mde")
+            output.run_command("insert", {"characters": outputtxt})
+            window.run_command("show_panel", {"panel": "output.mde"})
+        else:
+            sublime.status_message("Link validation: no broken links found")
+            window.destroy_output_panel("mde")
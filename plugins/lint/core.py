@@ -0,0 +1,1508 @@
+"""
+The headless markdown lint engine.
+
+It doesn't depend on Sublime Text's API, so it can also be run from command line:
+
+    python plugins/lint/core.py [--settings FILE] [--jobs N] PATH [PATH ...]
+
+All markdown files found in the given directories are linted in parallel.
+"""
+import argparse
+import bisect
+import concurrent.futures
+import fnmatch
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+if __package__:
+    from ..text import RegionIndex, split_blocks
+else:
+    # run as a script, the shared helpers are located in the parent directory
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from text import RegionIndex, split_blocks
+
+# Bump whenever a rule changes its results, to invalidate cached lint results.
+RULES_VERSION = 1
+
+# Maximum number of times to fix errors in a row.
+FIX_PASSES = 3
+
+# Editor settings read by rules, which results depend on besides `mde.lint` settings.
+VIEW_SETTINGS = ("tab_size", "translate_tabs_to_spaces", "wrap_width")
+
+
+# Kinds of line records produced by `tokenize()`. They are bit flags as a line
+# may be of several kinds at once (e.g. "---" is a setext underline and a list item).
+LINE = 0x01  # every line
+BLANK = 0x02  # run of consecutive blank lines
+FENCE = 0x04  # opening or closing code fence
+HEADING = 0x08  # line starting with hashes
+SETEXT = 0x10  # line consisting of dashes or equal signs only
+LIST = 0x20  # unordered list item
+OLIST = 0x40  # ordered list item
+QUOTE = 0x80  # block quote
+
+
+# patterns used to locate front matter and code blocks without a syntax definition
+FRONTMATTER_RE = re.compile(
+    r"\A---[ \t]*(?:(?:coffee|json|yaml)[ \t]*)?\n.*?^(?:---|\.{3})[ \t]*(?:\n|\Z)",
+    re.I | re.M | re.S,
+)
+LINE_RE = re.compile(r"^([ \t]*)(.*)\n?", re.M)
+INDENTED_CODE_RE = re.compile(r"(?:[ ]{4}|[ ]{0,3}\t)")
+FENCE_RE = re.compile(r"(`{3,}|~{3,})")
+HEADING_RE = re.compile(r"#{1,6}(?:[ \t]|$)")
+LIST_ITEM_RE = re.compile(r"(?:[0-9]{1,9}[.)]|[*+-])(?:[ \t]|$)")
+
+# matches strings to keep and comments to strip from sublime-settings files
+SETTINGS_COMMENT_RE = re.compile(r'("(?:\\.|[^"\\])*")|/\*.*?\*/|//[^\n]*', re.S)
+
+
+def line_begin(text, pt):
+    return text.rfind("\n", 0, pt) + 1
+
+
+def line_end(text, pt):
+    end = text.find("\n", pt)
+    return len(text) if end < 0 else end
+
+
+def apply_fixes(text, fixes):
+    """
+    Apply fixes to `text` at once.
+
+    :param text:   The text to fix
+    :param fixes:  The sorted, non-overlapping `(begin, end, replacement)` tuples
+                   as returned by `Linter.fixes()`
+
+    :returns:      The fixed text
+    """
+    pieces = []
+    pos = 0
+    for begin, end, replacement in fixes:
+        pieces.append(text[pos:begin])
+        pieces.append(replacement)
+        pos = end
+    pieces.append(text[pos:])
+    return "".join(pieces)
+
+
+def tokenize(text, begin=0, end=None):
+    """
+    Split `text` into line records in a single pass.
+
+    Consecutive blank lines are merged into one record, which also covers the line break
+    in front of them, so multi-line locators like the one of md012 can find the whole run.
+
+    :param text:   The text to tokenize
+    :param begin:  The offset of the first line to tokenize
+    :param end:    The offset after the last line to tokenize, which must be a line's begin
+
+    :returns:      A list of `(kinds, begin, end)` tuples, with `end` including the line break
+    """
+    records = []
+    size = len(text)
+    if end is None or end >= size:
+        lines = text[begin:].split("\n")
+    else:
+        lines = text[begin:end].split("\n")
+        lines.pop()
+    blank_begin = -1
+    for line in lines:
+        end = begin + len(line) + 1
+        stripped = line.lstrip(" ")
+        if not stripped.strip(" \t"):
+            if blank_begin < 0:
+                blank_begin = max(begin - 1, 0)
+            begin = end
+            continue
+
+        if blank_begin >= 0:
+            records.append((LINE | BLANK, blank_begin, begin))
+            blank_begin = -1
+
+        kinds = LINE
+        indent = len(line) - len(stripped)
+        c = stripped[0]
+        if c == "#":
+            kinds |= HEADING
+        elif c == ">":
+            if indent <= 4:
+                kinds |= QUOTE
+        elif c in "`~":
+            if indent <= 3 and stripped.startswith(c * 3):
+                kinds |= FENCE
+        elif c.isdigit():
+            if indent <= 3:
+                kinds |= OLIST
+        else:
+            if c in "-=" and not stripped.rstrip(c):
+                kinds |= SETEXT
+            if c in "*+-" and indent <= 3 and (len(stripped) == 1 or stripped[1].isspace()):
+                kinds |= LIST
+        records.append((kinds, begin, min(end, size)))
+        begin = end
+
+    if blank_begin >= 0:
+        records.append((LINE | BLANK, blank_begin, min(begin - 1, size)))
+    return records
+
+
+_patterns = {}
+
+
+def _compile(pattern):
+    """
+    Compile `pattern` in multiline mode along with a copy of it without leading `^`.
+    """
+    compiled = _patterns.get(pattern)
+    if compiled is None:
+        head = re.compile(pattern[1:], re.M) if pattern.startswith("^") else None
+        compiled = _patterns[pattern] = (re.compile(pattern, re.M), head)
+    return compiled
+
+
+def search(pattern, text, pos=0, endpos=None):
+    """
+    Search `pattern` in `text` between `pos` and `endpos`.
+
+    Same as `re.search(pattern, text[pos:endpos], re.M)` with offsets relative to `text`,
+    but without copying text. Hence `^` also matches at `pos`.
+    """
+    if endpos is None:
+        endpos = len(text)
+    compiled, head = _compile(pattern)
+    return (head and head.match(text, pos, endpos)) or compiled.search(text, pos, endpos)
+
+
+def finditer(pattern, text, pos=0, endpos=None):
+    """
+    Find all non-empty matches of `pattern` in `text` between `pos` and `endpos`.
+
+    Same as `re.finditer(pattern, text[pos:endpos], re.M)` with offsets relative to `text`,
+    but without copying text. Hence `^` also matches at `pos`.
+    """
+    if endpos is None:
+        endpos = len(text)
+    compiled, head = _compile(pattern)
+    mr = head and head.match(text, pos, endpos)
+    if mr:
+        yield mr
+        pos = mr.end(0)
+    for mr in compiled.finditer(text, pos, endpos):
+        yield mr
+
+
+class ListIndex(object):
+    """
+    Boundaries of lists, shared by the list rules of a lint run.
+
+    Lists are searched in place, so no rule needs to copy the remainder
+    of the document to find the end of a list.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.ends = {}
+
+    def end(self, pos, eol):
+        """
+        Return the end of the list, whose items follow `pos`.
+
+        :param pos:  The offset after the marker of the list's first item
+        :param eol:  The pattern matching the first line after the list
+
+        :returns:    The offset of the first line after the list
+        """
+        key = (pos, eol)
+        end = self.ends.get(key)
+        if end is None:
+            mr = search(eol, self.text, pos)
+            end = self.ends[key] = mr.start(0) if mr else len(self.text)
+        return end
+
+    def items(self, pattern, pos, eol):
+        """
+        Find the items of the list, which follow `pos`.
+
+        :param pos:      The offset after the marker of the list's first item
+        :param pattern:  The pattern matching a list item
+        :param eol:      The pattern matching the first line after the list
+
+        :returns:        An iterator of list item matches
+        """
+        return finditer(pattern, self.text, pos, self.end(pos, eol))
+
+
+def view_settings(document):
+    """
+    Return the editor settings of `document`, which rules read, as a dict.
+    """
+    settings = document.settings()
+    return {name: settings.get(name) for name in VIEW_SETTINGS}
+
+
+class Document(object):
+    """
+    The text plus scope provider the lint engine runs on.
+
+    Outside of Sublime Text, there is no syntax to tell where front matter and code blocks are,
+    so they are located by simple line based rules, which cover the common cases.
+    """
+
+    # the number of modifications, if the document is edited (like `sublime.View.change_count()`)
+    change_count = None
+
+    def __init__(self, text, settings=None):
+        """
+        :param text:      The text to lint
+        :param settings:  A dict with the editor settings "tab_size" and "wrap_width"
+        """
+        self.text = text
+        self._settings = settings or {}
+
+    def settings(self):
+        return self._settings
+
+    def find_by_selector(self, selector):
+        """
+        Find regions matching `selector`.
+
+        Only the selectors used by the lint engine are supported.
+
+        :param selector:  The selector to match
+
+        :returns:         A list of sorted `(begin, end)` tuples
+        """
+        if selector == Linter.frontmatter:
+            mr = FRONTMATTER_RE.match(self.text)
+            return [mr.span()] if mr else []
+
+        if selector == Linter.scope_block:
+            regions = []
+            fence = None
+            # indented code can't interrupt a paragraph and is a paragraph within lists
+            interrupt = True
+            in_list = False
+            for mr in LINE_RE.finditer(self.text):
+                indent, content = mr.groups()
+                if mr.start() == mr.end():
+                    break
+                if fence:
+                    if content.startswith(fence) and not content.strip(fence[0] + " \t"):
+                        fence = None
+                elif not content:
+                    interrupt = True
+                elif interrupt and not in_list and INDENTED_CODE_RE.match(indent):
+                    if regions and regions[-1][1] == mr.start():
+                        regions[-1] = (regions[-1][0], mr.end())
+                    else:
+                        regions.append(mr.span())
+                elif INDENTED_CODE_RE.match(indent):
+                    interrupt = False
+                else:
+                    mf = FENCE_RE.match(content)
+                    if mf:
+                        fence = mf.group(1)
+                    elif LIST_ITEM_RE.match(content):
+                        in_list = True
+                    elif not indent:
+                        in_list = False
+                    interrupt = mf is not None or HEADING_RE.match(content) is not None
+            return regions
+
+        return []
+
+
+class Linter(object):
+    """
+    The lint engine.
+
+    A linter keeps the state of incremental lint runs, so it is meant to be reused for
+    the same document.
+    """
+
+    blockdef = []
+    frontmatter = "meta.frontmatter"
+    scope_block = "markup.raw.block.markdown"
+
+    def __init__(self):
+        self.cache = {}
+        self.document = None
+        self.excluded = (RegionIndex(), RegionIndex())
+        # rule name -> statistics of the last profiled run
+        self.stats = None
+
+    def run(self, document, settings, incremental=False, profile=False):
+        """
+        Lint a document.
+
+        :param document:     The `Document` to lint
+        :param settings:     The `mde.lint` settings
+        :param incremental:  Whether to re-check only the blocks changed since the last run
+        :param profile:      Whether to record statistics per rule in `stats`
+
+        :returns:            A list of `(offset, rule, detail)` tuples sorted by offset
+        """
+        self.document = document
+        self.stats = {} if profile else None
+        self.excluded = tuple(
+            RegionIndex(document.find_by_selector(selector))
+            for selector in (self.frontmatter, self.scope_block)
+        )
+        text = document.text
+        if incremental:
+            return self.lint_incremental(text, settings)
+        return self.lint(self.rules(settings), text, tokenize(text))
+
+    def rules(self, settings):
+        """
+        Create a fresh instance of each enabled rule.
+
+        :param settings:  The `mde.lint` settings
+
+        :returns:         A list of rule instances in order of definition
+        """
+        mddef = globals()["mddef"]
+        uselist = []
+        disablelist = settings["disable"]
+        for cl in mddef.__subclasses__():
+            if cl.__name__ not in disablelist:
+                uselist.append(
+                    cl(settings[cl.__name__] if cl.__name__ in settings else None, self.document)
+                )
+                if self.stats is not None:
+                    self.stats.setdefault(
+                        cl.__name__.upper(),
+                        {"time": 0.0, "matches": 0, "selector_checks": 0, "diagnostics": 0},
+                    )
+        return uselist
+
+    def lint(self, rules, text, records):
+        """
+        Run all `rules` in a single pass over the line records of `text`.
+
+        :param rules:    The rule instances to run
+        :param text:     The text to lint
+        :param records:  The line records of `text` as returned by `tokenize()`
+
+        :returns:        A list of `(offset, rule, detail)` tuples sorted by offset
+        """
+        return self.merge(self.collect(rules, text, records))
+
+    def fixes(self, document, result, settings):
+        """
+        Compute fixes of all errors, which can be fixed automatically.
+
+        :param document:  The linted `Document`
+        :param result:    The `(offset, rule, detail)` tuples returned by `run()`
+        :param settings:  The `mde.lint` settings
+
+        :returns:         A list of sorted, non-overlapping `(begin, end, replacement)` tuples
+        """
+        self.document = document
+        text = document.text
+        rules = {str(tar).split(" ", 1)[0]: tar for tar in self.rules(settings)}
+        fixes = []
+        for pt, rule, _ in result:
+            tar = rules.get(rule.split(" ", 1)[0])
+            if tar:
+                fix = tar.fix(text, pt)
+                if fix:
+                    fixes.append(fix)
+
+        fixes.sort()
+        result = []
+        for fix in fixes:
+            if not result or fix[0] >= result[-1][1] and fix != result[-1]:
+                result.append(fix)
+        return result
+
+    def merge(self, found):
+        result = []
+        for ret in found:
+            result.extend(ret)
+        return sorted(result, key=lambda t: t[0])
+
+    def collect(self, rules, text, records, begin=0, end=None, context=()):
+        """
+        Run all `rules` in a single pass over the given line records.
+
+        Each rule is called for the records of the kinds it subscribed to only. Rules which
+        subscribed to every line scan the text between `begin` and `end` at once instead,
+        which is equivalent.
+
+        :param rules:    The rule instances to run
+        :param text:     The text to lint
+        :param records:  The line records to check
+        :param begin:    The offset of the first line to check
+        :param end:      The offset after the last line to check
+        :param context:  The line records in front of `records`, which rules are fed with
+                         to restore their state. Their results are dropped.
+
+        :returns:        A list of `(offset, rule, detail)` tuples per rule
+        """
+        found = [[] for _ in rules]
+        patterns = [re.compile(tar.locator, tar.flag) for tar in rules]
+        lists = ListIndex(text)
+        dispatched = []
+        for i, tar in enumerate(rules):
+            tar.lists = lists
+            if tar.kinds & LINE:
+                found[i] = self.test(tar, text, patterns[i], begin, end)
+            else:
+                dispatched.append((i, tar))
+
+        subscribers = {}
+        for records, found in ((context, [[] for _ in rules]), (records, found)):
+            for kinds, begin, end in records:
+                rules_of_kind = subscribers.get(kinds)
+                if rules_of_kind is None:
+                    rules_of_kind = subscribers[kinds] = [
+                        (i, tar) for i, tar in dispatched if tar.kinds & kinds
+                    ]
+                for i, tar in rules_of_kind:
+                    if not tar.finish:
+                        found[i].extend(self.test(tar, text, patterns[i], begin, end))
+
+        return found
+
+    def lint_incremental(self, text, settings):
+        """
+        Lint `text` re-checking only the blocks which changed since the last run.
+
+        Results of rules, which only look at a block and its neighbours, are cached per block.
+        A block is re-checked if its text, the text of its neighbours or the excluded regions
+        within it changed. Stateful rules, which depend on everything in front of a match, are
+        re-run over the cached line records of all blocks, which is cheap as they only
+        subscribe to a few kinds of lines.
+
+        :param text:      The text to lint
+        :param settings:  The `mde.lint` settings
+
+        :returns:         A list of `(offset, rule, detail)` tuples sorted by offset
+        """
+        change_count = self.document.change_count
+        cache = self.cache
+        key = (settings, view_settings(self.document))
+        if cache.get("settings") != key:
+            cache.clear()
+            cache.update(settings=key, records={}, results={})
+        elif change_count is not None and cache.get("change_count") == change_count:
+            return cache["result"]
+
+        rules = self.rules(settings)
+        local = [i for i, tar in enumerate(rules) if not tar.stateful]
+        stateful = [i for i, tar in enumerate(rules) if tar.stateful]
+        stateful_kinds = 0
+        for i in stateful:
+            stateful_kinds |= rules[i].kinds & ~LINE
+
+        starts = split_blocks(text)
+        blocks = [text[starts[i] : starts[i + 1]] for i in range(len(starts) - 1)]
+        records_cache = {}
+        results_cache = {}
+        summaries = []
+        found = [[] for _ in rules]
+        prev_records = ()
+        for i, block in enumerate(blocks):
+            begin, end = starts[i], starts[i + 1]
+
+            # blank lines at the beginning of the document have no line break in front of them
+            records_key = (begin == 0, block)
+            records = cache["records"].get(records_key)
+            if records is None:
+                records = [(k, b - begin, e - begin) for k, b, e in tokenize(text, begin, end)]
+            records_cache[records_key] = records
+            records = [(k, b + begin, e + begin) for k, b, e in records]
+            summaries.extend(r for r in records if r[0] & stateful_kinds)
+
+            key = (
+                blocks[i - 1] if i > 0 else None,
+                block,
+                blocks[i + 1] if i + 1 < len(blocks) else None,
+                i + 2 >= len(blocks),
+                tuple(excluded.within(begin, end) for excluded in self.excluded),
+            )
+            results = cache["results"].get(key)
+            if results is None:
+                fresh = self.rules(settings)
+                results = self.collect(
+                    [fresh[j] for j in local], text, records, begin, end, prev_records
+                )
+                results = [[(p - begin, r, d) for p, r, d in ret] for ret in results]
+            results_cache[key] = results
+            for j, ret in zip(local, results):
+                found[j].extend((p + begin, r, d) for p, r, d in ret)
+            prev_records = records
+
+        for j, ret in zip(stateful, self.collect([rules[j] for j in stateful], text, summaries)):
+            found[j] = ret
+
+        result = self.merge(found)
+        cache.update(
+            change_count=change_count,
+            records=records_cache,
+            results=results_cache,
+            result=result,
+        )
+        return result
+
+    def test(self, tar, text, pattern, begin=0, end=None):
+        if end is None:
+            end = len(text)
+        # look up excluded regions only, if there are any nearby
+        frontmatter, scope_block = self.excluded
+        if not frontmatter.intersects(begin, end):
+            frontmatter = None
+        if tar.__class__ in self.blockdef or not scope_block.intersects(begin, end):
+            scope_block = None
+
+        if self.stats is not None:
+            started = time.perf_counter()
+        matches = checks = 0
+
+        ret = []
+        for mr in pattern.finditer(text, begin, end):
+            # print('find %d,%d' % (mr.start(tar.gid), mr.end(tar.gid)))
+            matches += 1
+            if frontmatter:
+                checks += 1
+                if frontmatter.contains(mr.start(0)):
+                    continue
+            if scope_block:
+                checks += 1
+                if scope_block.contains(mr.start(0)):
+                    continue
+            ans = tar.test(text, mr.start(tar.gid), mr.end(tar.gid))
+            for p in ans:
+                ret.append((p, str(tar), ans[p]))
+            if tar.finish:
+                break
+
+        if self.stats is not None:
+            stats = self.stats[tar.__class__.__name__.upper()]
+            stats["time"] += time.perf_counter() - started
+            stats["matches"] += matches
+            stats["selector_checks"] += checks
+            stats["diagnostics"] += len(ret)
+
+        return ret
+
+
+class mddef(object):
+    flag = 0
+    gid = 0
+    desc = "default"
+    finish = False
+    kinds = LINE
+    stateful = False
+    lists = None
+
+    def __init__(self, settings, view):
+        self.settings = settings
+
+    def __str__(self):
+        return self.__class__.__name__.upper() + " - " + self.desc
+
+    def fix(self, text, pt):
+        """
+        Compute the fix of an error reported by `test`.
+
+        :param text:  The linted text
+        :param pt:    The offset of the error
+
+        :returns:     A `(begin, end, replacement)` tuple or None if the rule can't fix errors
+        """
+        return None
+
+
+class md001(mddef):
+    flag = re.M
+    desc = "Header levels should only increment by one level at a time"
+    locator = r"^#{1,6}(?!#)"
+    kinds = HEADING
+    stateful = True
+
+    lastMatch = None
+
+    def test(self, text, s, e):
+        ret = {}
+        if self.lastMatch:
+            n1 = len(self.lastMatch)
+            n2 = e - s
+            if n2 > n1:
+                if n2 != n1 + 1:
+                    ret[s] = "expected %d, %d found" % (n1 + 1, n2)
+        self.lastMatch = text[s:e]
+        return ret
+
+
+class md002(mddef):
+    flag = re.M
+    desc = "First header should be a h1 header"
+    locator = r"^(?:#{1,6}(?!#))|(?:-+$|=+$)"
+    stateful = True
+
+    def test(self, text, s, e):
+        ret = {}
+        # print (text[s:e])
+        self.finish = True
+        if re.match(r"#{1,6}(?!#)", text[s:e]):
+            if e - s != 1:
+                ret[s] = "level %d found" % (e - s)
+        elif re.match("-+|=+", text[s:e]):
+            if not re.match("=+", text[s:e]):
+                ret[s] = "level 2 found"
+        return ret
+
+
+class md003(mddef):
+    flag = re.M
+    desc = "Header style"
+    locator = r"^((?:-+|=+)|(?:#{1,6}(?!#).*))$"
+    kinds = HEADING | SETEXT
+    stateful = True
+    gid = 1
+
+    ratx = r"^(#{1,6}(?!#)).*$"
+    ratxc = r"^(#{1,6}(?!#)).*?(#+)$"
+    rsetext = r"[\-\=]+"
+
+    def test(self, text, s, e):
+        ret = {}
+        t = text[s:e]
+        if self.settings == "atx":
+            if not re.match(self.ratx, t) or re.match(self.ratxc, t):
+                ret[s] = "expected atx"
+        elif self.settings == "atx_closed":
+            if not re.match(self.ratxc, t):
+                ret[s] = "expected atx_closed"
+        elif self.settings == "setext":
+            if not re.match(self.rsetext, t):
+                ret[s] = "expected setext"
+        elif self.settings == "any":
+            if re.match(self.ratx, t):
+                if re.match(self.ratxc, t):
+                    self.settings = "atx_closed"
+                else:
+                    self.settings = "atx"
+                return self.test(text, s, e)
+            elif re.match(self.rsetext, t):
+                self.settings = "setext"
+                return self.test(text, s, e)
+        return ret
+
+
+class md004(mddef):
+    flag = re.M
+    desc = "Unordered list style"
+    locator = r"^([ ]{0,3})[*+-](?=\s)"
+    kinds = LIST
+    stateful = True
+    eol = r"^(?=\S)"
+    gid = 1
+    lastSym = None
+    lastpos = -1
+
+    def __init__(self, settings, view):
+        super(md004, self).__init__(settings, view)
+        self.lvs = [None, None, None]
+
+    def test(self, text, s, e):
+        if self.lastpos > s:
+            return {}
+        self.lastpos = e
+
+        ret = {}
+        lvstack = []
+        basenspaces = e - s
+        sym = text[e : e + 1]
+        (ans, exp) = self.testsingle(sym)
+        if ans is None:
+            (ans, exp) = self.testcyc(sym, -1)
+            if ans is False:
+                ret[e] = "%s expected, %s found" % (exp, sym)
+        elif ans is False:
+            ret[e] = "%s expected, %s found" % (exp, sym)
+
+        mrs = self.lists.items(r"^(\s*)([*\-+])\s+", e + 1, self.eol)
+        for mr in mrs:
+            self.lastpos = mr.end(0)
+            sym = mr.group(2)
+            (ans, exp) = self.testsingle(sym)
+            if ans is None:
+                # cyclic or any
+                nspaces = len(mr.group(1))
+                if nspaces < basenspaces:
+                    lv = 0
+                elif nspaces == basenspaces:
+                    lv = -1
+                else:
+                    while len(lvstack) > 0:
+                        n = lvstack.pop()
+                        if n < nspaces:
+                            lvstack.append(n)
+                            break
+                    lv = len(lvstack)
+                    lvstack.append(nspaces)
+                (ans, exp) = self.testcyc(sym, lv)
+                if ans is False:
+                    ret[mr.start(2)] = "%s expected, %s found" % (exp, sym)
+            else:
+                if not ans:
+                    ret[mr.start(2)] = "%s expected, %s found" % (exp, sym)
+        return ret
+
+    def testsingle(self, sym):
+        if self.settings == "asterisk":
+            return (sym == "*", "*")
+        if self.settings == "plus":
+            return (sym == "+", "+")
+        if self.settings == "dash":
+            return (sym == "-", "-")
+        if self.settings == "single":
+            if self.lastSym:
+                return (self.lastSym == sym, self.lastSym)
+            else:
+                self.lastSym = sym
+                return (True, None)
+        return (None, None)
+
+    def testcyc(self, sym, lv):
+        if self.settings == "cyclic":
+            if self.lvs[lv]:
+                return (self.lvs[lv] == sym, self.lvs[lv])
+            else:
+                if sym not in self.lvs:
+                    self.lvs[lv] = sym
+                    return (True, None)
+                else:
+                    return (False, None)
+        if self.settings == "any":
+            if self.lvs[lv]:
+                return self.lvs[lv] == sym
+            else:
+                self.lvs[lv] = sym
+                return (True, None)
+        return (None, None)
+
+
+class md005(mddef):
+    flag = re.M
+    desc = "Inconsistent indentation for list items at the same level"
+    locator = r"^([ ]{0,3})[*+-](?=\s)"
+    kinds = LIST
+    stateful = True
+    eol = r"^(?=\S)"
+    gid = 1
+    lastpos = -1
+
+    def __init__(self, settings, view):
+        super(md005, self).__init__(settings, view)
+        self.lvs = {}
+
+    def spacecheck(self, lv, nspaces):
+        if lv in self.lvs:
+            if self.lvs[lv] != nspaces:
+                return (False, self.lvs[lv])
+        else:
+            self.lvs[lv] = nspaces
+        return (True, nspaces)
+
+    def test(self, text, s, e):
+        # print(self.lastpos)
+        if self.lastpos > s:
+            return {}
+        self.lastpos = e
+
+        ret = {}
+        lvstack = []
+        # sym = text[e:e + 1]
+        nspaces = e - s
+        basenspaces = e - s
+        (ans, exp) = self.spacecheck(-1, nspaces)
+        if not ans:
+            ret[s] = "%s expected, %s found" % (exp, nspaces)
+
+        mrs = self.lists.items(r"^( *)([*\-+])\s+", e + 1, self.eol)
+        for mr in mrs:
+            # print('----')
+            # print(mr.group(2))
+            # print('----')
+            self.lastpos = mr.end(0)
+            # sym = mr.group(2)
+            nspaces = len(mr.group(1))
+            if nspaces < basenspaces:
+                lv = 0
+            elif nspaces == basenspaces:
+                lv = -1
+            else:
+                while len(lvstack) > 0:
+                    n = lvstack.pop()
+                    if n < nspaces:
+                        lvstack.append(n)
+                        break
+                lv = len(lvstack)
+                lvstack.append(nspaces)
+            (ans, exp) = self.spacecheck(lv, nspaces)
+            if ans is False:
+                ret[mr.start(2)] = "%s expected, %s found" % (exp, nspaces)
+        return ret
+
+
+class md006(mddef):
+    flag = re.M
+    desc = "Consider starting bulleted lists at the beginning of the line"
+    locator = r"^([ ]{0,3})[*+-](?=\s)"
+    kinds = LIST
+    stateful = True
+    eol = r"^(?=\S)"
+    gid = 1
+    lastpos = -1
+
+    def test(self, text, s, e):
+        # print(self.lastpos)
+        if self.lastpos > s:
+            return {}
+        self.lastpos = e
+
+        ret = {}
+        # lvstack = []
+        # sym = text[e:e + 1]
+        nspaces = e - s
+        if nspaces > 0:
+            ret[s] = "%d found" % nspaces
+
+        mrs = self.lists.items(r"^(\s*)([*\-+])\s+", e + 1, self.eol)
+        for mr in mrs:
+            # print('----')
+            # print(mr.group(2))
+            # print('----')
+            self.lastpos = mr.end(0)
+        return ret
+
+
+class md007(mddef):
+    flag = re.M
+    desc = "Unordered list indentation"
+    locator = r"^([ ]{0,3})[*+-](?=\s)"
+    kinds = LIST
+    stateful = True
+    eol = r"^(?=\S)"
+    gid = 1
+    lastpos = -1
+
+    def __init__(self, settings, view):
+        if settings == 0:
+            self.settings = view.settings().get("tab_size", 4)
+        else:
+            self.settings = settings
+
+    def spacecheck(self, nspaces):
+        return (nspaces % self.settings == 0, "%d*n" % self.settings)
+
+    def test(self, text, s, e):
+        # print(self.lastpos)
+        if self.lastpos > s:
+            return {}
+        self.lastpos = e
+
+        ret = {}
+        nspaces = e - s
+        (ans, exp) = self.spacecheck(nspaces)
+        if not ans:
+            ret[s] = "%s expected, %s found" % (exp, nspaces)
+
+        mrs = self.lists.items(r"^( *)([*\-+])\s+", e + 1, self.eol)
+        for mr in mrs:
+            # print('----')
+            # print(mr.group(2))
+            # print('----')
+            self.lastpos = mr.end(0)
+            nspaces = len(mr.group(1))
+            (ans, exp) = self.spacecheck(nspaces)
+            if ans is False:
+                ret[mr.start(2)] = "%s expected, %s found" % (exp, nspaces)
+        return ret
+
+
+class md009(mddef):
+    flag = re.M
+    desc = "Trailing spaces"
+    locator = r" +$"
+
+    def test(self, text, s, e):
+        return {s: "%d spaces" % (e - s)}
+
+    def fix(self, text, pt):
+        return (pt, line_end(text, pt), "")
+
+
+class md010(mddef):
+    flag = re.M
+    desc = "Hard tabs"
+    locator = r"\t"
+
+    def __init__(self, settings, view):
+        super(md010, self).__init__(settings, view)
+        self.tab_size = view.settings().get("tab_size", 4)
+
+    def test(self, text, s, e):
+        return {s: "hard tab found"}
+
+    def fix(self, text, pt):
+        column = len(text[line_begin(text, pt) : pt].expandtabs(self.tab_size))
+        return (pt, pt + 1, " " * (self.tab_size - column % self.tab_size))
+
+
+class md011(mddef):
+    flag = re.M
+    desc = "Reversed link syntax"
+    locator = r"\(.*?\)\[.*?\]"
+
+    def test(self, text, s, e):
+        return {s: "reversed link syntax found"}
+
+
+class md012(mddef):
+    desc = "Multiple consecutive blank lines"
+    locator = r"\n{3,}"
+    kinds = BLANK
+
+    def test(self, text, s, e):
+        return {s + 1: "%d blank lines" % (e - s - 1)}
+
+    def fix(self, text, pt):
+        end = pt
+        while end < len(text) and text[end] == "\n":
+            end += 1
+        return (pt - 1, end, "\n\n")
+
+
+class md013(mddef):
+    flag = re.M
+    desc = "Line length"
+    locator = r"^.+$"
+
+    def __init__(self, settings, view):
+        if settings == 0:
+            self.settings = view.settings().get("wrap_width", 80)
+        else:
+            self.settings = settings
+
+    def test(self, text, s, e):
+        t = text[s:e]
+        if not re.match(r"^[ ]*[>\+\-\*].+$", t):
+            if e - s > self.settings:
+                return {s: "%d characters" % (e - s)}
+        return {}
+
+
+class md018(mddef):
+    flag = re.M
+    desc = "No space after hash on atx style header"
+    locator = r"^#{1,6}(?![#\s]).*(?<!#)$"
+    kinds = HEADING
+
+    def test(self, text, s, e):
+        return {s: "no space"}
+
+    def fix(self, text, pt):
+        hashes = len(text[pt : pt + 6]) - len(text[pt : pt + 6].lstrip("#"))
+        return (pt + hashes, pt + hashes, " ")
+
+
+class md019(mddef):
+    flag = re.M
+    desc = "Multiple spaces after hash on atx style header"
+    locator = r"^#{1,6}(?=\s{2,}).*(?<!#)$"
+    kinds = HEADING
+
+    def test(self, text, s, e):
+        return {s: "too many spaces"}
+
+    def fix(self, text, pt):
+        mr = re.compile(r"#+([ \t]+)").match(text, pt)
+        return (mr.start(1), mr.end(1), " ")
+
+
+class md020(mddef):
+    flag = re.M
+    desc = "No space inside hashes on closed atx style header"
+    locator = r"^(#{1,6}(?!#))(.*?)(#+)$"
+    kinds = HEADING
+    gid = 2
+
+    def test(self, text, s, e):
+        t = text[s:e]
+        if t[0] != " ":
+            return {s: "no space on the left"}
+        elif t[-1] != " ":
+            return {s: "no space on the right"}
+        return {}
+
+
+class md021(mddef):
+    flag = re.M
+    desc = "Multiple spaces inside hashes on closed atx style header"
+    locator = r"(#{1,6}(?!#))(.*?)(#+)"
+    gid = 2
+
+    def test(self, text, s, e):
+        t = text[s:e]
+        if len(t) > 1 and ((t[0] == " " and t[1] == " ") or (t[-1] == " " and t[-2] == " ")):
+            return {s: "too many spaces"}
+        return {}
+
+
+class md022(mddef):
+    flag = re.M
+    desc = "Headers should be surrounded by blank lines"
+    locator = r"^((?:-+|=+)|(?:#{1,6}(?!#).*))$"
+    kinds = HEADING | SETEXT
+
+    def test(self, text, s, e):
+        if re.match(r"-+|=+", text[s:e]):
+            st = text.rfind("\n", 0, max(s - 1, 0))
+            s = st + 1
+
+        if s > 1 and text[s - 2] != "\n":
+            return {s: "blank line required before this line"}
+
+        if e < len(text) - 2 and text[e + 1] != "\n":
+            return {s: "blank line required after this line"}
+        return {}
+
+
+class md023(mddef):
+    flag = re.M
+    desc = "Headers must start at the beginning of the line"
+    locator = r"^( +)((?:-+|=+)|(?:#{1,6}(?!#).*))$"
+    kinds = HEADING | SETEXT
+    gid = 1
+
+    def test(self, text, s, e):
+        return {s: "%d spaces found" % (e - s)}
+
+    def fix(self, text, pt):
+        end = pt
+        while text[end] == " ":
+            end += 1
+        return (pt, end, "")
+
+
+class md024(mddef):
+    flag = re.M
+    desc = "Multiple headers with the same content"
+    locator = r"^((?:-+|=+)|(?:#{1,6}(?!#).*))$"
+    kinds = HEADING | SETEXT
+    stateful = True
+    gid = 1
+
+    ratx = r"(#{1,6}(?!#)) *(.*?) *$"
+    ratxc = r"(#{1,6}(?!#)) *(.*?) *(#+)$"
+
+    def __init__(self, settings, view):
+        super(md024, self).__init__(settings, view)
+        self.storage = []
+
+    def test(self, text, s, e):
+        ret = {}
+        title = text[s:e]
+        if re.match(r"-+|=+", title):
+            st = text.rfind("\n", 0, max(s - 1, 0))
+            title = text[st + 1 : max(s - 1, 0)]
+        else:
+            mr = re.match(self.ratxc, title)
+            if mr:
+                title = mr.group(2)
+            else:
+                mr = re.match(self.ratx, title)
+                title = mr.group(2)
+        if title in self.storage:
+            ret[s] = "%s duplicated" % repr(title)
+        else:
+            self.storage.append(title)
+        return ret
+
+
+class md025(mddef):
+    flag = re.M
+    desc = "Multiple top level headers in the same document"
+    locator = r"^(={3,}|#(?!#).*)$"
+    kinds = HEADING | SETEXT
+    stateful = True
+    count = 0
+
+    def test(self, text, s, e):
+        ret = {}
+        self.count += 1
+        if self.count > 1:
+            ret[s] = "%d found" % self.count
+        return ret
+
+
+class md026(mddef):
+    flag = re.M
+    desc = "Trailing punctuation in header"
+    locator = r"^((?:-+|=+)|(?:#{1,6}(?!#).*))$"
+    kinds = HEADING | SETEXT
+    gid = 1
+
+    ratx = r"(#{1,6}(?!#)) *(.*?) *$"
+    ratxc = r"(#{1,6}(?!#)) *(.*?) *?(#+)$"
+
+    def test(self, text, s, e):
+        ret = {}
+        title = text[s:e]
+        if re.match(r"-+|=+", title):
+            st = text.rfind("\n", 0, max(s - 1, 0))
+            title = text[st + 1 : max(s - 1, 0)]
+        else:
+            mr = re.match(self.ratxc, title)
+            if mr:
+                title = mr.group(2)
+            else:
+                mr = re.match(self.ratx, title)
+                title = mr.group(2)
+        if len(title) > 0 and title[-1] in self.settings:
+            ret[s] = "%s found" % repr(title[-1])
+        return ret
+
+
+class md027(mddef):
+    flag = re.M
+    desc = "Multiple spaces after blockquote symbol"
+    locator = r"^ {0,4}> {2,}"
+    kinds = QUOTE
+    stateful = True
+    list_indent = 0
+
+    def test(self, text, s, e):
+        ret = {}
+        match = re.search(r"^ {0,4}>( {2,}(?:[-+*]|[0-9]+\.)\s)", text[s : s + 100])
+        if match:
+            self.list_indent = len(match.group(1))
+        elif e - s - 1 != self.list_indent:
+            ret[s] = "too many spaces"
+        return ret
+
+
+class md028(mddef):
+    flag = re.M
+    desc = "Blank line inside blockquote"
+    locator = r"^ {0,4}>.*$"
+    kinds = QUOTE
+    lastQuoteEnd = None
+
+    def test(self, text, s, e):
+        ret = {}
+        if self.lastQuoteEnd:
+            if re.match(r"^(\n *){2,}$", text[self.lastQuoteEnd : s]):
+                ret[self.lastQuoteEnd] = "found one"
+        self.lastQuoteEnd = e
+        return ret
+
+
+class md029(mddef):
+    flag = re.M
+    desc = "Ordered list item prefix"
+    locator = r"^ {0,3}([0-9]+)\.(?=\s)"
+    kinds = OLIST
+    gid = 1
+    eol = r"^\s*$"
+    lastpos = -1
+
+    def test(self, text, s, e):
+        if self.lastpos > s:
+            return {}
+        self.lastpos = e
+
+        sym = text[s:e]
+        if self.settings == "any":
+            if sym == "1":
+                style = None
+            else:
+                style = "ordered"
+        elif self.settings == "one":
+            style = "one"
+        elif self.settings == "ordered":
+            style = "ordered"
+
+        mrs = self.lists.items(r"^ {0,3}([0-9]+)\.(?=\s)", e + 1, self.eol)
+        lastSym = sym
+        ret = {}
+        for mr in mrs:
+            self.lastpos = mr.end(0)
+            sym = mr.group(1)
+            if style is None:
+                if sym == "1":
+                    style = "one"
+                else:
+                    style = "ordered"
+
+            if style == "one":
+                if sym != "1":
+                    ret[mr.start(1)] = "%s found, '1' expected" % repr(sym)
+            else:
+                if int(sym) != int(lastSym) + 1:
+                    ret[mr.start(1)] = "%s found, '%d' expected" % (
+                        repr(sym),
+                        int(lastSym) + 1,
+                    )
+                lastSym = sym
+        return ret
+
+
+class md030(mddef):
+    flag = re.M
+    desc = "Ordered list item prefix"
+    locator = r"^ {0,3}(([0-9]+\.)|[*+-])(?=\s)"
+    kinds = LIST | OLIST
+    gid = 1
+
+    def test(self, text, s, e):
+        nspaces, against_value = self.spaces(text, s, e)
+        ret = {}
+        if against_value != nspaces:
+            ret[e] = "%d spaces found, %d expected" % (nspaces, against_value)
+        return ret
+
+    def fix(self, text, pt):
+        begin = line_begin(text, pt)
+        s = begin + len(text[begin:pt]) - len(text[begin:pt].lstrip(" "))
+        nspaces, against_value = self.spaces(text, s, pt)
+        # leave tabs and empty list items, which would get trailing spaces, alone
+        if text[pt + nspaces] in "\t\n":
+            return None
+        return (pt, pt + nspaces, " " * against_value)
+
+    def spaces(self, text, s, e):
+        """
+        Count spaces after a list marker.
+
+        :param text:  The linted text
+        :param s:     The offset of the list marker
+        :param e:     The offset after the list marker
+
+        :returns:     A tuple of the number of spaces found and expected
+        """
+        sym = text[s:e]
+        mr = re.match(r"[0-9]+\.", sym)
+        if mr:
+            single = self.settings["ol_single"]
+            multi = self.settings["ol_multi"]
+        else:
+            single = self.settings["ul_single"]
+            multi = self.settings["ul_multi"]
+        nspaces = 0
+        p = e
+        while text[p] == " ":
+            p += 1
+            nspaces += 1
+        while text[p] != "\n" and text[p] != "\r":
+            p += 1
+        is_multi = (len(text) >= p + 2) and (text[p + 1] in "\r\n")
+        against_value = multi if is_multi else single
+        return nspaces, against_value
+
+
+def load_settings(file_name=None):
+    """
+    Load `mde.lint` settings for headless lint runs.
+
+    :param file_name:  The path of a json file with settings to override the package's defaults
+
+    :returns:          The `mde.lint` settings
+    """
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "..", "Preferences.sublime-settings"
+    )
+    with open(path, encoding="utf-8") as f:
+        text = SETTINGS_COMMENT_RE.sub(lambda m: m.group(1) or "", f.read())
+    settings = json.loads(text)["mde.lint"]
+    if file_name:
+        with open(file_name, encoding="utf-8") as f:
+            settings.update(json.load(f))
+    return settings
+
+
+def line_starts(text):
+    """
+    Build a table to look up line numbers of text offsets by bisection.
+
+    :param text:  The text to index
+
+    :returns:     A list of the offsets of all lines of `text`
+    """
+    return [0] + [mr.end() for mr in re.finditer(r"\n", text)]
+
+
+def format_result(text, result, starts=None):
+    """
+    Format lint results like the output panel.
+
+    :param text:    The linted text
+    :param result:  The `(offset, rule, detail)` tuples returned by `Linter.run()`
+    :param starts:  The line offsets of `text` as returned by `line_starts()`
+
+    :returns:       A list of lines
+    """
+    if starts is None:
+        starts = line_starts(text)
+    return [
+        "line %d: %s, %s" % (bisect.bisect_right(starts, pt), rule, detail)
+        for pt, rule, detail in result
+    ]
+
+
+def format_stats(stats):
+    """
+    Format rule statistics as a table sorted by time.
+
+    :param stats:  The `stats` of a profiled `Linter`
+
+    :returns:      A list of lines
+    """
+    lines = ["rule     time [ms]    matches  selector checks  diagnostics"]
+    for name, st in sorted(stats.items(), key=lambda item: (-item[1]["time"], item[0])):
+        lines.append(
+            "%-6s %11.3f %10d %16d %12d"
+            % (name, st["time"] * 1000, st["matches"], st["selector_checks"], st["diagnostics"])
+        )
+    return lines
+
+
+def lint_file(file_name, settings, editor_settings, profile=False, fix=False):
+    """
+    Lint a file.
+
+    :param file_name:        The path of the file to lint
+    :param settings:         The `mde.lint` settings
+    :param editor_settings:  A dict with the editor settings "tab_size" and "wrap_width"
+    :param profile:          Whether to record statistics per rule
+    :param fix:              Whether to fix errors, which can be fixed automatically, in place
+
+    :returns:                A tuple of `file_name`, the lines of formatted results,
+                             the statistics per rule or None and the number of fixed errors
+    """
+    with open(file_name, encoding="utf-8") as f:
+        text = f.read()
+        newline = f.newlines if isinstance(f.newlines, str) else "\n"
+    linter = Linter()
+    document = Document(text, editor_settings)
+    result = linter.run(document, settings, profile=profile)
+
+    fixed = 0
+    # fixes may reveal new errors, e.g. expanded tabs may become trailing spaces
+    for _ in range(FIX_PASSES if fix else 0):
+        fixes = linter.fixes(document, result, settings)
+        if not fixes:
+            break
+        text = apply_fixes(text, fixes)
+        fixed += len(fixes)
+        document = Document(text, editor_settings)
+        result = linter.run(document, settings)
+    if fixed:
+        with open(file_name, "w", encoding="utf-8", newline=newline) as f:
+            f.write(text)
+
+    return file_name, format_result(text, result), linter.stats, fixed
+
+
+def is_excluded_folder(name, exclude=()):
+    """
+    Return whether a folder is hidden or matches one of the `exclude` glob patterns.
+    """
+    return name.startswith(".") or any(fnmatch.fnmatch(name, pattern) for pattern in exclude)
+
+
+def find_files(paths, extensions, exclude=()):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not is_excluded_folder(d, exclude))
+                for file_name in sorted(files):
+                    if os.path.splitext(file_name)[1] in extensions:
+                        yield os.path.join(root, file_name)
+        else:
+            yield path
+
+
+def main(argv=None):
+    """
+    Lint markdown files in parallel and print results.
+
+    :returns: 1 if any file has lint errors, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(
+        description="Lint markdown files with MarkdownEditing's lint rules."
+    )
+    parser.add_argument("paths", nargs="+", help="markdown files or directories to lint")
+    parser.add_argument(
+        "--settings", help="json file with mde.lint settings to override the defaults"
+    )
+    parser.add_argument("--jobs", type=int, help="number of worker processes")
+    parser.add_argument("--tab-size", type=int, default=4, help="used by md007 if set to 0")
+    parser.add_argument("--wrap-width", type=int, default=80, help="used by md013 if set to 0")
+    parser.add_argument(
+        "--extensions",
+        default=".md,.mdown,.markdown",
+        help="comma separated extensions of files to lint in directories",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=("table", "json"),
+        help="print statistics per rule of all files to stderr",
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="fix errors of md009, md010, md012, md018, md019, md023 and md030 in place",
+    )
+    args = parser.parse_args(argv)
+
+    settings = load_settings(args.settings)
+    editor_settings = {"tab_size": args.tab_size, "wrap_width": args.wrap_width}
+    files = list(find_files(args.paths, args.extensions.split(",")))
+
+    errors = 0
+    fixed = 0
+    stats = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = pool.map(
+            lint_file,
+            files,
+            itertools.repeat(settings),
+            itertools.repeat(editor_settings),
+            itertools.repeat(bool(args.profile)),
+            itertools.repeat(args.fix),
+            chunksize=max(1, len(files) // (16 * (args.jobs or os.cpu_count() or 1))),
+        )
+        for file_name, lines, file_stats, file_fixed in results:
+            for line in lines:
+                print("%s: %s" % (file_name, line))
+            errors += len(lines)
+            fixed += file_fixed
+            for name, st in (file_stats or {}).items():
+                total = stats.setdefault(name, dict.fromkeys(st, 0))
+                for k, v in st.items():
+                    total[k] += v
+
+    if args.fix:
+        print("%d error(s) fixed" % fixed, file=sys.stderr)
+    if args.profile == "json":
+        print(json.dumps(stats, indent=4, sort_keys=True), file=sys.stderr)
+    elif args.profile:
+        print("\n".join(format_stats(stats)), file=sys.stderr)
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
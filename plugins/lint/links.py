@@ -0,0 +1,298 @@
+"""
+The headless link validator.
+
+It resolves relative links and reference definitions of markdown documents against
+the file system and checks `#fragment`s against the headings of the linked documents.
+It doesn't depend on Sublime Text's API, so it can also be run from command line:
+
+    python plugins/lint/links.py [--jobs N] [--root DIR] PATH [PATH ...]
+
+Files are checked by a pool of threads, which share one `Resolver`, so each directory
+is listed and each linked document is parsed only once.
+"""
+import argparse
+import concurrent.futures
+import os
+import re
+import sys
+import urllib.parse
+
+if __package__:
+    from ..text import CODE_SPAN_RE, FENCED_CODE_RE, RegionIndex
+    from .core import Document, Linter, find_files, format_result
+else:
+    from core import Document, Linter, find_files, format_result
+
+    # core put the parent directory with the shared helpers on sys.path
+    from text import CODE_SPAN_RE, FENCED_CODE_RE, RegionIndex
+
+# The validator runs without a syntax definition and must find the destination of every
+# link, so it has patterns of its own. They accept angled destinations and titles. The
+# reference index only locates the names of definitions and markers, which are confirmed
+# by scopes, and `references.INLINE_LINK_RE` only matches links simple enough to be
+# converted to references.
+INLINE_LINK_RE = re.compile(
+    r"""
+    !?\[ (?: [^\[\]\n] | \[[^\[\]\n]*\] )* \]       # text, which may contain brackets
+    \( [ \t]* ( <[^>\n]*> | [^\s()]* (?:\([^\s()]*\)[^\s()]*)* )  # destination
+    (?: [ \t]+ (?: "[^"\n]*" | '[^'\n]*' | \([^()\n]*\) ) )? [ \t]* \)  # title
+    """,
+    re.X,
+)
+DEFINITION_RE = re.compile(r"^[ ]{0,3}(?:>[ ]?)*\[([^\^\]][^\]]*)\]:[ \t]*(<[^>\n]*>|\S+)", re.M)
+SCHEME_RE = re.compile(r"[a-z][a-z0-9+.\-]*:|//", re.I)
+
+ATX_HEADING_RE = re.compile(r"^[ ]{0,3}#{1,6}[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$", re.M)
+SETEXT_HEADING_RE = re.compile(r"^[ ]{0,3}([^\s>#*+\-=|].*?)[ \t]*\n[ ]{0,3}(?:=+|-+)[ \t]*$", re.M)
+HEADING_ID_RE = re.compile(r"[ \t]*\{#([^\s}]+)[^}]*\}$")
+HTML_ANCHOR_RE = re.compile(r"<[a-z][^>]*?\s(?:id|name)=[\"']([^\"']+)[\"']", re.I)
+SLUG_STRIP_RE = re.compile(r"\]\([^)]*\)|[^\w\- ]")
+
+
+def code_regions(text):
+    """
+    Locate front matter, code blocks and code spans.
+
+    :param text:  The markdown text
+
+    :returns:     A `RegionIndex` of all regions, which don't contain links or headings
+    """
+    document = Document(text)
+    regions = document.find_by_selector(Linter.frontmatter)
+    regions += document.find_by_selector(Linter.scope_block)
+    regions += [m.span() for m in FENCED_CODE_RE.finditer(text)]
+    regions += [m.span() for m in CODE_SPAN_RE.finditer(text)]
+    return RegionIndex(regions)
+
+
+def slugify(title):
+    """
+    Create the anchor of a heading like GitHub does.
+
+    :param title:  The text of the heading
+
+    :returns:      The lower-cased title without punctuation and spaces replaced by dashes
+    """
+    return SLUG_STRIP_RE.sub("", title.strip().lower()).replace(" ", "-")
+
+
+def find_anchors(text, excluded=None):
+    """
+    Find the anchors of all headings and html elements with an id or name.
+
+    Equal slugs get a numeric suffix, starting with ``-1`` for the second one.
+
+    :param text:      The markdown text
+    :param excluded:  A `RegionIndex` of code, defaults to the result of `code_regions()`
+
+    :returns:         A set of anchors
+    """
+    if excluded is None:
+        excluded = code_regions(text)
+    headings = sorted(
+        (m.start(), m.group(1))
+        for heading_re in (ATX_HEADING_RE, SETEXT_HEADING_RE)
+        for m in heading_re.finditer(text)
+        if not excluded.contains(m.start(1))
+    )
+    anchors = set()
+    counts = {}
+    for _, title in headings:
+        m = HEADING_ID_RE.search(title)
+        if m:
+            anchors.add(m.group(1))
+            title = title[: m.start()]
+        slug = slugify(title)
+        count = counts.get(slug, 0)
+        counts[slug] = count + 1
+        anchors.add("%s-%d" % (slug, count) if count else slug)
+    anchors.update(
+        m.group(1) for m in HTML_ANCHOR_RE.finditer(text) if not excluded.contains(m.start())
+    )
+    return anchors
+
+
+def find_links(text, excluded=None):
+    """
+    Find the destinations of all inline links, images and reference definitions.
+
+    :param text:      The markdown text
+    :param excluded:  A `RegionIndex` of code, defaults to the result of `code_regions()`
+
+    :returns:         A list of `(offset, destination)` tuples sorted by offset
+    """
+    if excluded is None:
+        excluded = code_regions(text)
+    links = []
+    for link_re, group in ((INLINE_LINK_RE, 1), (DEFINITION_RE, 2)):
+        for m in link_re.finditer(text):
+            if not excluded.contains(m.start()):
+                pt, destination = m.start(group), m.group(group)
+                if destination.startswith("<"):
+                    pt, destination = pt + 1, destination[1:-1]
+                links.append((pt, destination))
+    links.sort()
+    return links
+
+
+class Resolver(object):
+    """
+    Directory listings and anchors of documents to resolve links against.
+
+    Entries are validated by modification time, so a resolver can be kept as long as
+    the process lives. Threads may share a resolver. At worst, they read an entry twice.
+    """
+
+    extensions = (".md", ".mdown", ".markdown")
+
+    def __init__(self):
+        # directory -> (mtime, names)
+        self.listings = {}
+        # file name -> (mtime, anchors)
+        self.anchors = {}
+
+    def listing(self, directory):
+        """
+        Return the names of the entries of `directory` or ``None`` if it doesn't exist.
+        """
+        try:
+            mtime = os.stat(directory).st_mtime
+            entry = self.listings.get(directory)
+            if entry is None or entry[0] != mtime:
+                entry = self.listings[directory] = (mtime, frozenset(os.listdir(directory)))
+        except OSError:
+            return None
+        return entry[1]
+
+    def exists(self, path):
+        """
+        Return whether the normalized `path` exists, looking it up in the listing of its directory.
+
+        Names are compared case sensitive, as links are on most web servers.
+        """
+        directory, name = os.path.split(path)
+        if not name:
+            return os.path.isdir(directory)
+        names = self.listing(directory)
+        return names is not None and name in names
+
+    def anchors_of(self, file_name):
+        """
+        Return the anchors of a markdown document or ``None`` if it can't be read.
+        """
+        try:
+            mtime = os.stat(file_name).st_mtime
+            entry = self.anchors.get(file_name)
+            if entry is None or entry[0] != mtime:
+                with open(file_name, encoding="utf-8", errors="replace") as f:
+                    entry = self.anchors[file_name] = (mtime, find_anchors(f.read()))
+        except OSError:
+            return None
+        return entry[1]
+
+
+def check_links(text, file_name, resolver, excluded=None, root=None):
+    """
+    Check the local links of a markdown document.
+
+    Links with a scheme like ``https:`` are ignored. Without `file_name`, only
+    links to anchors of the document itself can be checked.
+
+    :param text:       The markdown text
+    :param file_name:  The path of the document, relative links are resolved against
+    :param resolver:   The `Resolver` to look up files and anchors with
+    :param excluded:   A `RegionIndex` of code, defaults to the result of `code_regions()`
+    :param root:       The directory to resolve links starting with ``/`` against
+
+    :returns:          A list of `(offset, problem, destination)` tuples sorted by offset
+    """
+    if excluded is None:
+        excluded = code_regions(text)
+    own_anchors = None
+    result = []
+    for pt, destination in find_links(text, excluded):
+        if not destination or SCHEME_RE.match(destination):
+            continue
+        path, _, fragment = destination.partition("#")
+        path = urllib.parse.unquote(path.partition("?")[0])
+        fragment = urllib.parse.unquote(fragment)
+
+        if not path:
+            if fragment:
+                if own_anchors is None:
+                    own_anchors = find_anchors(text, excluded)
+                if fragment not in own_anchors:
+                    result.append((pt, "missing anchor", destination))
+            continue
+
+        if path.startswith("/"):
+            if root is None:
+                continue
+            target = os.path.join(root, path.lstrip("/"))
+        elif file_name:
+            target = os.path.join(os.path.dirname(file_name), path)
+        else:
+            continue
+
+        target = os.path.normpath(target)
+        if not resolver.exists(target):
+            result.append((pt, "missing file", destination))
+        elif fragment and os.path.splitext(target)[1] in resolver.extensions:
+            anchors = resolver.anchors_of(target)
+            if anchors is not None and fragment not in anchors:
+                result.append((pt, "missing anchor", destination))
+    return result
+
+
+def check_file(file_name, resolver, root=None):
+    """
+    Check the local links of a file.
+
+    Undecodable bytes are replaced, so they can't hide the links of the rest of the file.
+    A file, which can't be read, is reported as a single result line.
+
+    :returns:  A tuple of `file_name` and the lines of formatted results
+    """
+    try:
+        with open(file_name, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except OSError as error:
+        return file_name, ["unreadable file, %s" % (error.strerror or error)]
+    return file_name, format_result(text, check_links(text, file_name, resolver, root=root))
+
+
+def main(argv=None):
+    """
+    Check local links of markdown files in parallel and print broken ones.
+
+    :returns: 1 if any link is broken, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(
+        description="Find links to missing files and anchors in markdown files."
+    )
+    parser.add_argument("paths", nargs="+", help="markdown files or directories to check")
+    parser.add_argument("--jobs", type=int, default=8, help="number of worker threads")
+    parser.add_argument("--root", help="directory to resolve links starting with / against")
+    parser.add_argument(
+        "--extensions",
+        default=".md,.mdown,.markdown",
+        help="comma separated extensions of files to check in directories",
+    )
+    args = parser.parse_args(argv)
+
+    resolver = Resolver()
+    files = list(find_files(args.paths, args.extensions.split(",")))
+    errors = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(check_file, file_name, resolver, args.root) for file_name in files]
+        for future in futures:
+            file_name, lines = future.result()
+            for line in lines:
+                print("%s: %s" % (file_name, line))
+            errors += len(lines)
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
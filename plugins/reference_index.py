@@ -0,0 +1,417 @@
+"""
+Per-view index of reference definitions, markers and footnotes.
+
+Commands used to scan the whole buffer with several `find_all()` calls and one
+`match_selector()` call per marker candidate each time they were invoked. The
+index parses the buffer once and keeps the result until the view's
+``change_count`` changes. The buffer is split into blocks separated by blank lines
+and only blocks whose text changed are parsed again.
+
+The scope index answers "extent of the scope at a point" and "next point matching
+a selector" by bisecting cached `find_by_selector()` results instead of walking
+the buffer character by character.
+
+Exported listeners:
+    MdeReferenceIndexListener
+"""
+import bisect
+import re
+import sublime
+
+from .text import FOOTNOTE_END_RE, RegionIndex, split_blocks
+from .view import MdeViewEventListener
+
+definition_scope_name = "meta.link.reference.def.markdown"
+# reference and footnote definitions
+definition_selector = "meta.link.reference.def"
+marker_selector = (
+    "markup.underline.link.markdown, "
+    "meta.image.inline.description.markdown, meta.image.reference.description.markdown, "
+    "meta.link.inline.description.markdown, meta.link.reference.description.markdown, "
+    "meta.link.reference.literal.description.markdown"
+)
+
+DEFINITION_RE = re.compile(r"(?<=^\[)([^\]]+)(?=\]:)", re.M)
+MARKER_RES = (
+    re.compile(r"(?<=\]\[)([^\]]+)(?=\])"),  # ][???]
+    re.compile(r"(?<=\[)([^\]]*)(?=\]\[\])"),  # [???][]
+    re.compile(r"(?<=\[)(\^[^\]]+)(?=\])(?!\s*\]:)"),  # [^???]
+    re.compile(r"(?<!\]\[)(?<=\[)([^\]]+)(?=\])(?!\]\[)(?!\]\()(?!\]:)"),  # [???]
+)
+LINK_RE = re.compile(r"\[(.+)\]:\s+(?:<([^>]+)>|(\S+))", re.M)
+# destination and optional title of a definition, which may be on the next line
+DESTINATION_RE = re.compile(
+    r"""[ \t]*(?:<([^>\n]*)>|(\S+))
+    (?:(?:[ \t]+|[ \t]*\n[ \t]*)(?:"([^"\n]*)"|'([^'\n]*)'|\(([^()\n]*)\))[ \t]*(?:\n|\Z))?""",
+    re.X,
+)
+
+
+class Entry(object):
+    """All regions of a name and the label of its first occurrence."""
+
+    def __init__(self, regions, label):
+        self.regions = regions
+        self.label = label
+
+
+def parse_block(text):
+    """
+    Find definition names and marker candidates in a block of text.
+
+    :param text:  The text of the block
+
+    :returns:     A tuple of the definition names' spans and a tuple of marker candidates'
+                  spans per pattern of `MARKER_RES`, all relative to the block's beginning
+    """
+    return (
+        tuple(m.span() for m in DEFINITION_RE.finditer(text)),
+        tuple(tuple(m.span() for m in marker_re.finditer(text)) for marker_re in MARKER_RES),
+    )
+
+
+def group_by_name(text, spans):
+    """
+    Group spans by their lower-cased and stripped text.
+
+    :param text:   The text the spans point into
+    :param spans:  The `(begin, end)` tuples to group
+
+    :returns:      An ordered ``{name: Entry}`` dictionary
+    """
+    ids = {}
+    for begin, end in spans:
+        name = text[begin:end].strip()
+        key = name.lower()
+        region = sublime.Region(begin, end)
+        if key in ids:
+            ids[key].regions.append(region)
+        else:
+            ids[key] = Entry([region], name)
+    return ids
+
+
+class ReferenceIndex(object):
+    """
+    Definitions, markers and footnotes of a view keyed by lower-cased name.
+
+    Use `ReferenceIndex.get(view)` to get an up-to-date index. The returned dictionaries
+    are shared by all callers and must not be modified.
+    """
+
+    # view id -> index
+    indexes = {}
+
+    @classmethod
+    def get(cls, view):
+        """
+        Return the index of `view`, updated to the view's current ``change_count``.
+        """
+        index = cls.indexes.get(view.id())
+        if index is None:
+            index = cls.indexes[view.id()] = cls()
+        index.update(view)
+        return index
+
+    @classmethod
+    def discard(cls, view):
+        cls.indexes.pop(view.id(), None)
+
+    def __init__(self):
+        self.change_count = None
+        self.view = None
+        self.text = ""
+        # block text -> result of parse_block()
+        self.blocks = {}
+        self.definition_spans = []
+        self.marker_spans = []
+        self.definition_regions = []
+        self._definitions = None
+        self._definition_scopes = None
+        self._markers = None
+        self._footnotes = None
+        self._links = None
+        # name -> result of preview()
+        self._previews = {}
+
+    def update(self, view):
+        """
+        Parse all blocks of `view`, which changed since the last update.
+        """
+        change_count = view.change_count()
+        if change_count == self.change_count:
+            return
+
+        text = view.substr(sublime.Region(0, view.size()))
+        blocks = {}
+        definition_spans = []
+        marker_spans = ([], [], [], [])
+        starts = split_blocks(text)
+        for begin, end in zip(starts, starts[1:]):
+            block = text[begin:end]
+            parsed = self.blocks.get(block)
+            if parsed is None:
+                parsed = parse_block(block)
+            blocks[block] = parsed
+            definitions, markers = parsed
+            definition_spans.extend((begin + b, begin + e) for b, e in definitions)
+            for spans, candidates in zip(marker_spans, markers):
+                spans.extend((begin + b, begin + e) for b, e in candidates)
+
+        self.change_count = change_count
+        self.view = view
+        self.text = text
+        self.blocks = blocks
+        self.definition_spans = definition_spans
+        # taken right away, so previews of an outdated index still match its text
+        self.definition_regions = view.find_by_selector(definition_selector)
+        # candidates are ordered by pattern first, just like consecutive `find_all()` calls
+        self.marker_spans = [span for spans in marker_spans for span in spans]
+        self._definitions = None
+        self._definition_scopes = None
+        self._markers = None
+        self._footnotes = None
+        self._links = None
+        self._previews = {}
+
+    @property
+    def definitions(self):
+        """
+        All reference and footnote definitions as ``{name: Entry}`` dictionary.
+
+        The regions of an entry span the names of its definitions.
+        """
+        if self._definitions is None:
+            self._definitions = group_by_name(self.text, self.definition_spans)
+        return self._definitions
+
+    @property
+    def footnotes(self):
+        """
+        The footnote definitions as ``{name: Entry}`` dictionary with names starting with ``^``.
+        """
+        if self._footnotes is None:
+            self._footnotes = {k: v for k, v in self.definitions.items() if k[:1] == "^"}
+        return self._footnotes
+
+    @property
+    def markers(self):
+        """
+        All reference and footnote markers as ``{name: Entry}`` dictionary.
+
+        Marker candidates are located by regular expressions and confirmed by
+        a single `find_by_selector()` call.
+        """
+        if self._markers is None:
+            scopes = RegionIndex(
+                (r.begin(), r.end()) for r in self.view.find_by_selector(marker_selector)
+            )
+            self._markers = group_by_name(
+                self.text, (span for span in self.marker_spans if scopes.contains(span[0]))
+            )
+        return self._markers
+
+    @property
+    def links(self):
+        """
+        The urls of reference definitions as ``{name: url}`` dictionary.
+
+        Footnotes are not included and names keep their case. Only the first definition
+        of a name is included.
+        """
+        if self._links is None:
+            links = {}
+            for region in self.view.find_by_selector(definition_scope_name):
+                for match in LINK_RE.finditer(self.text[region.begin() : region.end()]):
+                    name, angled_link, unquoted_link = match.groups()
+                    # the first definition of a name wins, just like in rendered markdown
+                    links.setdefault(name, angled_link or unquoted_link)
+            self._links = links
+        return self._links
+
+    def preview(self, key):
+        """
+        Return what the first definition of a lower-cased name defines.
+
+        Only the definition itself is parsed and the result is kept until the view changes,
+        so it is cheap enough to be called on each hover. Definitions, which are not scoped
+        as such, like the ones in code blocks, are skipped. The result describes the text
+        of the last update, even if the view was modified since.
+
+        :param key:  The lower-cased name, which starts with ``^`` for footnotes
+
+        :returns:    The body of a footnote, a tuple of a link's url and title (or ``None``)
+                     or ``None`` if `key` is not defined
+        """
+        if key not in self._previews:
+            entry = self.definitions.get(key)
+            if self._definition_scopes is None:
+                self._definition_scopes = RegionIndex(
+                    (r.begin(), r.end()) for r in self.definition_regions
+                )
+            region = None
+            if entry is not None:
+                for region in entry.regions:
+                    if self._definition_scopes.contains(region.begin()):
+                        break
+                else:
+                    region = None
+            preview = None
+            if region is not None:
+                # skip "]:"
+                begin = region.end() + 2
+                if key[:1] == "^":
+                    # the body ends at the next definition at the latest
+                    i = bisect.bisect_right(self.definition_spans, (begin,))
+                    limit = (
+                        self.definition_spans[i][0] - 1
+                        if i < len(self.definition_spans)
+                        else len(self.text)
+                    )
+                    end = FOOTNOTE_END_RE.search(self.text, begin, limit).end()
+                    preview = self.text[begin:end].strip()
+                else:
+                    m = DESTINATION_RE.match(self.text, begin)
+                    if m:
+                        url, title = m.group(1) or m.group(2), m.group(3) or m.group(4) or m.group(
+                            5
+                        )
+                        preview = (url, title)
+            self._previews[key] = preview
+        return self._previews[key]
+
+
+class ScopeRuns(RegionIndex):
+    """
+    Runs of text matching a selector.
+    """
+
+    def extent(self, pt):
+        """
+        Return the `(begin, end)` tuple of the run containing `pt` or ``None``.
+        """
+        i = bisect.bisect_right(self.begins, pt) - 1
+        if i >= 0 and pt < self.ends[i]:
+            return (self.begins[i], self.ends[i])
+        return None
+
+    def next(self, pt):
+        """
+        Return the first position at or after `pt` within a run or ``None``.
+        """
+        i = bisect.bisect_right(self.ends, pt)
+        if i < len(self.begins):
+            return max(self.begins[i], pt)
+        return None
+
+    def previous(self, pt):
+        """
+        Return the last position at or before `pt` within a run or ``None``.
+        """
+        i = bisect.bisect_right(self.begins, pt) - 1
+        if i >= 0:
+            return min(self.ends[i] - 1, pt)
+        return None
+
+
+class ScopeIndex(object):
+    """
+    Cached runs of selectors of a view, which are looked up by bisection.
+
+    Use `ScopeIndex.get(view)` to get an index, which is valid for the view's
+    current ``change_count``.
+    """
+
+    # view id -> index
+    indexes = {}
+
+    @classmethod
+    def get(cls, view):
+        """
+        Return the index of `view`, cleared if the view changed since the last call.
+        """
+        index = cls.indexes.get(view.id())
+        if index is None:
+            index = cls.indexes[view.id()] = cls()
+        change_count = view.change_count()
+        if change_count != index.change_count:
+            index.change_count = change_count
+            index.selectors = {}
+        index.view = view
+        return index
+
+    @classmethod
+    def discard(cls, view):
+        cls.indexes.pop(view.id(), None)
+
+    def __init__(self):
+        self.change_count = None
+        self.view = None
+        # selector -> ScopeRuns
+        self.selectors = {}
+
+    def runs(self, selector):
+        """
+        Return the `ScopeRuns` of `selector`.
+        """
+        runs = self.selectors.get(selector)
+        if runs is None:
+            runs = self.selectors[selector] = ScopeRuns(
+                (r.begin(), r.end()) for r in self.view.find_by_selector(selector)
+            )
+        return runs
+
+    def extent(self, pt):
+        """
+        Return the region around `pt`, whose scopes include all scopes found at `pt`.
+
+        :param pt:  The text position to start at
+
+        :returns:   A ``sublime.Region``, which is empty if `pt` is at the end of the buffer
+        """
+        selector = self.view.scope_name(pt).strip()
+        extent = self.runs(selector).extent(pt) if selector else None
+        return sublime.Region(*extent) if extent else sublime.Region(pt, pt)
+
+    def find(self, pt, selector, backwards=False, char=None):
+        """
+        Return the nearest position from `pt` on matching `selector`.
+
+        :param pt:         The text position to start at
+        :param selector:   The selector to match
+        :param backwards:  If ``True`` search towards the beginning of the buffer
+        :param char:       Skip positions of this character
+
+        :returns:          The found position or the last position looked at,
+                           which is ``1`` backwards and ``size - 1`` forwards.
+        """
+        runs = self.runs(selector)
+        if backwards:
+            found = pt
+            while found is not None and found > 0:
+                found = runs.previous(found)
+                if found is None or found < 1:
+                    break
+                if char is None or self.view.substr(found) != char:
+                    return found
+                found -= 1
+            return 1 if pt > 0 else pt
+
+        size = self.view.size()
+        found = pt
+        while found is not None and found < size:
+            found = runs.next(found)
+            if found is None or found >= size:
+                break
+            if char is None or self.view.substr(found) != char:
+                return found
+            found += 1
+        return size - 1 if pt < size else pt
+
+
+class MdeReferenceIndexListener(MdeViewEventListener):
+    """Drop the reference and scope indexes of closed views."""
+
+    def on_close(self):
+        ReferenceIndex.discard(self.view)
+        ScopeIndex.discard(self.view)
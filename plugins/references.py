@@ -12,19 +12,28 @@ Exported commands:
     MdeReferenceDeleteReferenceCommand
     MdeReferenceOrganizeCommand
     MdeGatherMissingLinkMarkersCommand
+    MdeReferenceCleanupCommand
+    MdeReferenceCheckUrlsCommand
     MdeConvertInlineLinkToReferenceCommand
     MdeConvertInlineLinksToReferencesCommand
 """
+import collections
+import html
+import os
 import sublime
 import re
 import operator
-import urllib.parse
+import threading
 
+from .lint.core import apply_fixes
+from .reference_index import LINK_RE, ReferenceIndex, ScopeIndex, definition_scope_name
+from .url_check import UrlChecker, is_broken
+from .urls import is_url, mangle_url, suggest_default_link_name
 from .view import MdeTextCommand
 from .view import MdeViewEventListener
+from .workspace_index import WorkspaceIndex
 
 refname_scope_name = "entity.name.reference.link.markdown"
-definition_scope_name = "meta.link.reference.def.markdown"
 footnote_scope_name = "meta.link.reference.footnote.markdown-extra"
 marker_scope_name = "meta.link.reference.description.markdown"
 marker_literal_scope_name = "meta.link.reference.literal.description.markdown"
@@ -47,43 +56,16 @@ class Obj(object):
 
 
 def getMarkers(view, name=""):
-    """Find all markers."""
-    # returns {name -> Region}
-    markers = []
-    name = re.escape(name)
-    if name == "":
-        markers.extend(view.find_all(r"(?<=\]\[)([^\]]+)(?=\])", 0))  # ][???]
-        markers.extend(view.find_all(r"(?<=\[)([^\]]*)(?=\]\[\])", 0))  # [???][]
-        markers.extend(view.find_all(r"(?<=\[)(\^[^\]]+)(?=\])(?!\s*\]:)", 0))  # [^???]
-        markers.extend(
-            view.find_all(r"(?<!\]\[)(?<=\[)([^\]]+)(?=\])(?!\]\[)(?!\]\()(?!\]:)", 0)
-        )  # [???]
-    else:
-        # ][name]
-        markers.extend(view.find_all(r"(?<=\]\[)(?i)(%s)(?=\])" % name, 0))
-        markers.extend(view.find_all(r"(?<=\[)(?i)(%s)(?=\]\[\])" % name, 0))  # [name][]
-        markers.extend(
-            view.find_all(r"(?<!\]\[)(?<=\[)(?i)(%s)(?=\])(?!\]\[)(?!\]\()(?!\]:)" % name, 0)
-        )  # [name]
-        if name[0] == "^":
-            # [(^)name]
-            markers.extend(view.find_all(r"(?<=\[)(%s)(?=\])(?!\s*\]:)" % name, 0))
-    regions = []
-
-    selector = marker_ref_scope_name + ", " + marker_text_scope_name
-    for x in markers:
-        if view.match_selector(x.begin(), selector):
-            regions.append(x)
-
-    ids = {}
-    for reg in regions:
-        name = view.substr(reg).strip()
-        key = name.lower()
-        if key in ids:
-            ids[key].regions.append(reg)
-        else:
-            ids[key] = Obj(regions=[reg], label=name)
-    return ids
+    """Find all markers.
+
+    Args:
+        name (str, optional): Specific name to filter for
+
+    Returns:
+        dict: {name -> Obj} mapping where Objs have a
+              regions attribute with a list of regions
+    """
+    return filter_by_name(ReferenceIndex.get(view).markers, name)
 
 
 def getReferences2(view):
@@ -93,15 +75,7 @@ def getReferences2(view):
     Returns:
         dict: {name: link} mapping
     """
-    pattern = re.compile(r"\[(.+)\]:\s+(?:<([^>]+)>|(\S+))", re.MULTILINE)
-
-    ret = {}
-    for definition_line in view.find_by_selector(definition_scope_name):
-        for reference_def in pattern.finditer(view.substr(definition_line)):
-            name, angled_link, unquoted_link = reference_def.groups()
-            assert not ret.get(name)
-            ret[name] = angled_link or unquoted_link
-    return ret
+    return ReferenceIndex.get(view).links
 
 
 def getReferences(view, name=""):
@@ -114,23 +88,15 @@ def getReferences(view, name=""):
         dict: {name -> Obj} mapping where Objs have a
               regions attribute with a list of regions
     """
+    return filter_by_name(ReferenceIndex.get(view).definitions, name)
+
 
-    refs = []
-    name = re.escape(name)
+def filter_by_name(ids, name):
+    """Return the entry of `name` from `ids` if given or all of them otherwise."""
     if name == "":
-        refs.extend(view.find_all(r"(?<=^\[)([^\]]+)(?=\]:)", 0))
-    else:
-        refs.extend(view.find_all(r"(?<=^\[)(%s)(?=\]:)" % name, 0))
-    regions = refs
-    ids = {}
-    for reg in regions:
-        name = view.substr(reg).strip()
-        key = name.lower()
-        if key in ids:
-            ids[key].regions.append(reg)
-        else:
-            ids[key] = Obj(regions=[reg], label=name)
-    return ids
+        return ids
+    key = name.lower()
+    return {key: ids[key]} if key in ids else {}
 
 
 def isMarkerDefined(view, name):
@@ -140,26 +106,12 @@ def isMarkerDefined(view, name):
 
 def getCurrentScopeRegion(view, pt):
     """Extend the region under current scope."""
-    orig_scope = set(view.scope_name(pt).split())
-    cur_scope = set(view.scope_name(pt).split())
-    start = pt
-    while start > 0 and orig_scope.issubset(cur_scope):
-        start -= 1
-        cur_scope = set(view.scope_name(start - 1).split())
-    cur_scope = orig_scope
-    end = pt
-    while end < view.size() and orig_scope.issubset(cur_scope):
-        end += 1
-        cur_scope = set(view.scope_name(end).split())
-    return sublime.Region(start, end)
+    return ScopeIndex.get(view).extent(pt)
 
 
 def findScopeFrom(view, pt, selector, backwards=False, char=None):
     """Find the nearest position of a selector from given position."""
-    for pt in range(pt, 0, -1) if backwards else range(pt, view.size()):
-        if view.match_selector(pt, selector) and (char is None or view.substr(pt) != char):
-            break
-    return pt
+    return ScopeIndex.get(view).find(pt, selector, backwards, char)
 
 
 def get_reference(view, pos):
@@ -242,6 +194,8 @@ class MdeReferenceJumpCommand(MdeTextCommand):
                         edit_regions.extend(refs[defname_key].regions)
                     else:
                         missing_refs.append(defname)
+        if missing_refs:
+            missing_refs = self.open_workspace_definitions(missing_refs)
         if len(edit_regions) > 0:
             sels = view.sel()
             sels.clear()
@@ -270,6 +224,23 @@ class MdeReferenceJumpCommand(MdeTextCommand):
                     )
                 )
 
+    def open_workspace_definitions(self, names):
+        """Open definitions found in other files of the workspace. Return the remaining names."""
+        workspace = WorkspaceIndex.get(self.view)
+        if not workspace:
+            return names
+        missing = []
+        for name in names:
+            definition = workspace.definition(name)
+            if definition is None:
+                missing.append(name)
+            else:
+                file_name, _, _, row, col = definition
+                self.view.window().open_file(
+                    "%s:%d:%d" % (file_name, row + 1, col + 1), sublime.ENCODED_POSITION
+                )
+        return missing
+
 
 class MdeReferenceJumpContextCommand(MdeReferenceJumpCommand):
     """Jump between definition and reference. Used in context menu."""
@@ -281,24 +252,6 @@ class MdeReferenceJumpContextCommand(MdeReferenceJumpCommand):
         )
 
 
-def is_url(contents):
-    """Return if contents contains an URL."""
-    re_match_urls = re.compile(
-        r"""((?:[a-z][\w-]+:(?:/{1,3}|[a-z0-9%])|www\d{0,3}[.]|[a-z0-9.\-]+[.‌​][a-z]{2,4}/)(?:[^\s()<>]+|(([^\s()<>]+|(([^\s()<>]+)))*))+(?:(([^\s()<>]+|(‌​([^\s()<>]+)))*)|[^\s`!()[]{};:'".,<>?«»“”‘’]))""",
-        re.DOTALL,
-    )
-    m = re_match_urls.search(contents)
-    return True if m else False
-
-
-def mangle_url(url):
-    """Mangle URL for links."""
-    url = url.strip()
-    if re.match(r"^([a-z0-9-]+\.)+\w{2,4}", url, re.IGNORECASE):
-        url = "http://" + url
-    return url
-
-
 def append_reference_link(edit, view, name, url):
     r"""Detect if file ends with \n."""
     if view.substr(view.size() - 1) == "\n":
@@ -311,46 +264,19 @@ def append_reference_link(edit, view, name, url):
     return sublime.Region(edit_position, edit_position + len(name))
 
 
-def suggest_default_link_name(name, link, image):
-    """Suggest default link name in camel case, if `name` is small.
-
-    Args:
-        name (str): An existing name, used as a fallback
-        link (str): The link href
-        image (bool): Whether the link points to an image or not. Used for fallback.
+def check_for_link(view, link):
+    """Check if the link already defined. Return the name if so.
 
-    Returns:
-        str: A suggested reference name in CamelCase, or `name`.
+    Definitions of the view take precedence over the ones of the workspace index.
     """
-    ret = ""
-    # string.punctuation minus -.:;<=>_
-    no_punctuation = str.maketrans("", "", "!\"#$%&'()*+,/?@[\\]^`{|}~")
-    name_segs = name.translate(no_punctuation).split()
-    if len(name_segs) > 1:
-        for word in name_segs:
-            ret += word.capitalize()
-            if len(ret) > 30:
-                break
-        return ("image" if image else "") + ret
-    elif len(name) < 4:
-        try:
-            parseresult = urllib.parse.urlparse(re.sub(r"/$", "", link))
-            doc_name = parseresult.path.split("/")[-1]
-            if doc_name:
-                return doc_name
-            elif parseresult.netloc:
-                return parseresult.netloc
-        except Exception as e:
-            print("Couldn't parse url", name, image, e)
-            return name
-    return name
-
-
-def check_for_link(view, link):
-    """Check if the link already defined. Return the name if so."""
     links_by_name = getReferences2(view)
     names_by_link = {v: k for k, v in links_by_name.items()}
-    return names_by_link.get(link)
+    name = names_by_link.get(link)
+    if name is None:
+        workspace = WorkspaceIndex.get(view)
+        if workspace:
+            name = workspace.name_of(link)
+    return name
 
 
 class MdeReferenceNewReferenceCommand(MdeTextCommand):
@@ -542,6 +468,14 @@ class MdeReferenceDeleteReferenceCommand(MdeTextCommand):
             )
 
 
+def link_of_definition(line):
+    """Return the link of a reference definition line."""
+    match = LINK_RE.match(line)
+    if match is None:
+        return ""
+    return match.group(2) or match.group(3)
+
+
 class MdeReferenceOrganizeCommand(MdeTextCommand):
     """Sort and report all references."""
 
@@ -557,18 +491,20 @@ class MdeReferenceOrganizeCommand(MdeTextCommand):
         reference_order = dict(zip(reference_order, range(0, len(reference_order))))
 
         refs = getReferences(view)
+        text = view.substr(sublime.Region(0, view.size()))
         flatrefs = []
         flatfns = []
-        sel = view.sel()
-        sel.clear()
+        lines = []
         for name in refs:
             for link_reg in refs[name].regions:
-                line_reg = view.full_line(link_reg)
+                begin = text.rfind("\n", 0, link_reg.begin()) + 1
+                end = text.find("\n", link_reg.end()) + 1 or len(text)
+                label = text[link_reg.begin() : link_reg.end()].strip()
                 if name[0] == "^":
-                    flatfns.append((name, view.substr(line_reg).strip("\n")))
+                    flatfns.append((name, text[begin:end].strip("\n"), label))
                 else:
-                    flatrefs.append((name, view.substr(line_reg).strip("\n")))
-                sel.add(line_reg)
+                    flatrefs.append((name, text[begin:end].strip("\n"), label))
+                lines.append((begin, end))
 
         sorting_funcs = {
             "reference_order": lambda x: reference_order[x[0].lower()]
@@ -587,37 +523,51 @@ class MdeReferenceOrganizeCommand(MdeTextCommand):
             reverse=settings.get("mde.ref_organize_sort_reverse", False),
         )
 
-        view.run_command("left_delete")
-        if view.size() >= 2 and view.substr(sublime.Region(view.size() - 2, view.size())) == "\n\n":
-            view.erase(edit, sublime.Region(view.size() - 1, view.size()))
-        for fn_tuple in flatfns:
-            view.insert(edit, view.size(), fn_tuple[1])
-            view.insert(edit, view.size(), "\n")
-        view.insert(edit, view.size(), "\n")
-
+        # remove all definitions and append them sorted by a single replacement
+        lines.sort()
+        first = lines[0][0] if lines else len(text)
+        pieces = [text[:first]]
+        pos = first
+        for begin, end in lines:
+            pieces.append(text[pos:begin])
+            pos = max(pos, end)
+        pieces.append(text[pos:])
+        content = "".join(pieces)
+        if content.endswith("\n\n"):
+            content = content[:-1]
+        elif content and not content.endswith("\n"):
+            content += "\n"
+        first = min(first, len(content))
+        content += "".join(fn_tuple[1] + "\n" for fn_tuple in flatfns) + "\n"
+        ref_begins = []
         for ref_tuple in flatrefs:
-            view.insert(edit, view.size(), ref_tuple[1])
-            view.insert(edit, view.size(), "\n")
+            ref_begins.append(len(content))
+            content += ref_tuple[1] + "\n"
+        view.replace(edit, sublime.Region(first, len(text)), content[first:])
 
         # delete duplicate / report conflict
+        sel = view.sel()
         sel.clear()
-        refs = getReferences(view)
         conflicts = {}
         unique_links = {}
         output = ""
 
-        for name in refs:
-            if name[0] == "^":
-                continue
-            n_links = len(refs[name].regions)
-            if n_links > 1:
-                for ref in refs[name].regions:
-                    link_begin = findScopeFrom(view, ref.end(), ref_link_scope_name)
-                    link = view.substr(getCurrentScopeRegion(view, link_begin))
+        ref_lines = collections.OrderedDict()
+        for ref_tuple, begin in zip(flatrefs, ref_begins):
+            ref_lines.setdefault(ref_tuple[0], []).append((ref_tuple, begin))
+
+        labels = {}
+        for ref_tuple in flatfns + flatrefs:
+            labels.setdefault(ref_tuple[0], ref_tuple[2])
+
+        for name, entries in ref_lines.items():
+            if len(entries) > 1:
+                for ref_tuple, begin in entries:
+                    link = link_of_definition(ref_tuple[1])
                     if name in unique_links:
                         if link == unique_links[name]:
-                            output += "%s has duplicate value of %s\n" % (refs[name].label, link)
-                            sel.add(view.full_line(ref.begin()))
+                            output += "%s has duplicate value of %s\n" % (labels[name], link)
+                            sel.add(sublime.Region(begin, begin + len(ref_tuple[1]) + 1))
                         elif name in conflicts:
                             conflicts[name].append(link)
                         else:
@@ -625,22 +575,18 @@ class MdeReferenceOrganizeCommand(MdeTextCommand):
                     else:
                         unique_links[name] = link
 
-        # view.run_command("left_delete")
-
         for name in conflicts:
             output += "%s has conflict values: %s with %s\n" % (
-                refs[name].label,
+                labels[name],
                 unique_links[name],
                 ", ".join(conflicts[name]),
             )
 
         # report missing
-        refs = getReferences(view)
-        lower_refs = [ref.lower() for ref in refs]
         missings = []
-        for ref in refs:
+        for ref in labels:
             if ref not in reference_order:
-                missings.append(refs[ref].label)
+                missings.append(labels[ref])
         if len(missings) > 0:
             if len(missings) > 1:
                 noun, verb = "Definitions", "have"
@@ -655,7 +601,7 @@ class MdeReferenceOrganizeCommand(MdeTextCommand):
 
         missings = []
         for marker in markers:
-            if marker not in lower_refs:
+            if marker not in labels:
                 missings.append(markers[marker].label)
         if len(missings) > 0:
             if len(missings) > 1:
@@ -723,35 +669,253 @@ class MdeGatherMissingLinkMarkersCommand(MdeTextCommand):
                 view.insert(edit, view.size(), "[%s]: \n" % link)
 
 
-def convert2ref(view, edit, link_span, name, omit_name=False):
-    """Convert single link to reference."""
-    view.sel().clear()
-    link = view.substr(sublime.Region(link_span.a + 1, link_span.b - 1))
-    if omit_name:
-        view.replace(edit, link_span, "[]")
-        link_span = sublime.Region(link_span.a + 1, link_span.a + 1)
-        offset = len(link)
-    else:
-        view.replace(edit, link_span, "[%s]" % name)
-        link_span = sublime.Region(link_span.a + 1, link_span.a + 1 + len(name))
-        offset = len(link) - len(name)
-    view.sel().add(link_span)
-    view.show_at_center(link_span)
-
-    link_for_name = getReferences2(view).get(name)
-    if link_for_name:
-        if link_for_name != link:
-            raise Exception("Tried to insert a different link with the same name")
+FOOTNOTE_BODY_RE = re.compile(r"(?:[ \t]*\n)*(?: {4}|\t)[^\n]*(?:\n|\Z)")
+DEFINITION_LINE_RE = re.compile(r"(?:^|\n)\s*\[[^\]]*\]:.*\Z")
+
+
+class MdeReferenceCleanupCommand(MdeTextCommand):
+    """Delete unused definitions and add missing ones.
+
+    Both are found by a single look up of the reference index. All changes are applied
+    from the end of the buffer backwards by one edit, which is undone in one step.
+    Missing definitions are appended like by `MdeGatherMissingLinkMarkersCommand`
+    and the caret is placed behind each of them to enter their links.
+    """
+
+    def run(self, edit):
+        """Run command callback."""
+        view = self.view
+        index = ReferenceIndex.get(view)
+        text = index.text
+        definitions = index.definitions
+        markers = index.markers
+
+        deletions = []
+        for key, entry in definitions.items():
+            if key in markers:
+                continue
+            for region in entry.regions:
+                begin = text.rfind("\n", 0, region.begin()) + 1
+                end = text.find("\n", region.end()) + 1 or len(text)
+                if key[0] == "^":
+                    # indented paragraphs belong to the footnote
+                    match = FOOTNOTE_BODY_RE.match(text, end)
+                    while match:
+                        end = match.end()
+                        match = FOOTNOTE_BODY_RE.match(text, end)
+                deletions.append((begin, end))
+        missing = [
+            markers[key].label
+            for key in sorted(markers, key=lambda key: markers[key].regions[0].begin())
+            if key not in definitions
+        ]
+
+        fixes = []
+        for begin, end in sorted(deletions):
+            if fixes and begin <= fixes[-1][1]:
+                fixes[-1] = (fixes[-1][0], max(fixes[-1][1], end), "")
+            else:
+                fixes.append((begin, end, ""))
+
+        # the end of the content, which is kept
+        content_end = tail = len(text.rstrip())
+        for begin, end, _ in reversed(fixes):
+            if begin < tail <= end:
+                tail = begin
+                while tail > 0 and text[tail - 1].isspace():
+                    tail -= 1
+        if missing or tail < content_end:
+            fixes = [(b, min(e, tail), r) for b, e, r in fixes if b < tail]
+            appendix = "".join("[%s]: \n" % label for label in missing)
+            if tail and missing:
+                head = apply_fixes(text[:tail], fixes)
+                # separate from content, which is not a list of definitions
+                appendix = ("\n" if DEFINITION_LINE_RE.search(head) else "\n\n") + appendix
+            elif tail:
+                appendix = "\n"
+            fixes.append((tail, len(text), appendix))
+
+        for begin, end, replacement in reversed(fixes):
+            view.replace(edit, sublime.Region(begin, end), replacement)
+
+        if missing:
+            sel = view.sel()
+            sel.clear()
+            pt = view.size()
+            for label in reversed(missing):
+                pt -= 1
+                sel.add(sublime.Region(pt, pt))
+                pt -= len(label) + 4
+
+        sublime.status_message(
+            "%d unused definition(s) deleted, %d missing definition(s) added"
+            % (len(deletions), len(missing))
+        )
+
+
+class MdeReferenceCheckUrlsCommand(MdeTextCommand):
+    """Check urls of reference definitions and list broken ones.
+
+    Urls are requested in a worker thread, so the editor keeps responding. Each url is
+    requested once, no matter how many definitions use it. Statuses are cached for
+    ``ttl`` seconds of the ``mde.url_check`` setting.
+    """
+
+    checker = None
+    checker_settings = None
+
+    @classmethod
+    def get_checker(cls, settings):
+        """Return the url checker, created anew if its settings changed.
+
+        Unknown keys of the settings are ignored.
+        """
+        settings = {key: value for key, value in settings.items() if key in UrlChecker.options}
+        if cls.checker is None or cls.checker_settings != settings:
+            if cls.checker is not None:
+                cls.checker.shutdown()
+            cls.checker = UrlChecker(**settings)
+            cls.checker_settings = settings
+        return cls.checker
+
+    def run(self, edit, workspace=False):
+        """Run command callback.
+
+        Args:
+            workspace (bool): Whether to also check reference definitions of all files
+                in the workspace index
+        """
+        view = self.view
+        # url -> labels of the definitions using it
+        labels = collections.OrderedDict()
+        for name, url in getReferences2(view).items():
+            labels.setdefault(url, []).append("[%s]" % name)
+        index = WorkspaceIndex.get(view) if workspace else None
+        if index:
+            for file_name, (_, definitions) in sorted(index.files.items()):
+                if file_name == view.file_name():
+                    continue
+                for ref_id, url, row, _ in sorted(definitions.values(), key=lambda d: d[2]):
+                    labels.setdefault(url, []).append("%s:%d [%s]" % (file_name, row + 1, ref_id))
+
+        checker = self.get_checker(view.settings().get("mde.url_check", {}))
+        window = view.window() or sublime.active_window()
+        sublime.status_message("Checking urls...")
+
+        def check():
+            result = checker.check(list(labels))
+            sublime.set_timeout(lambda: self.show_result(window, labels, result))
+
+        thread = threading.Thread(target=check)
+        thread.daemon = True
+        thread.start()
+
+    def show_result(self, window, labels, result):
+        """List broken urls in the output panel."""
+        output = ""
+        for url, where in labels.items():
+            if url in result and is_broken(result[url][0]):
+                status, reason = result[url]
+                output += "%s %s\n" % (status or "Error:", reason)
+                output += "".join("    %s: %s\n" % (label, url) for label in where)
+
+        if output:
+            broken = sum(1 for status, _ in result.values() if is_broken(status))
+            sublime.status_message("%d of %d url(s) are broken" % (broken, len(result)))
+            output_panel = window.create_output_panel("mde")
+            output_panel.run_command("erase_view")
+            output_panel.run_command("append", {"characters": output})
+            window.run_command("show_panel", {"panel": "output.mde"})
         else:
-            # Skip insertion (no need, name already exists with same link)
-            return 0  # No insertion, no offset.
-    else:
-        _viewsize = view.size()
-        view.insert(edit, _viewsize, "[%s]: %s\n" % (name, link))
-        reference_span = sublime.Region(_viewsize + 1, _viewsize + 1 + len(name))
-        view.sel().add(reference_span)
+            sublime.status_message("All %d url(s) are reachable" % len(result))
+
+
+INLINE_LINK_RE = re.compile(r"\[([^\]]+)\]\((?!#)([^\)]+)\)")
+
+
+def convert2refs(view, edit, candidates):
+    """Convert inline links to references at once.
+
+    Args:
+        candidates (list): sorted (begin, end) tuples of `[text](link)` strings
 
-        return offset
+    Returns:
+        int: The number of converted links
+    """
+    # Remove all whitespace at the end of the file
+    whitespace_at_end = view.find(r"\s*\z", 0)
+    view.replace(edit, whitespace_at_end, "\n")
+
+    # If there is not already a reference list at the end, insert a new line at the end
+    if not view.find(r"\n\s*\[[^\]]*\]:.*\s*\z", 0):
+        view.insert(edit, view.size(), "\n")
+
+    text = view.substr(sublime.Region(0, view.size()))
+    existing_links = getReferences2(view)
+    links_by_name = dict(existing_links)
+    names_by_link = {v: k for k, v in links_by_name.items()}
+
+    link_spans = []
+    definitions = []
+    for begin, end in candidates:
+        m = INLINE_LINK_RE.match(text, begin, end)
+        if m is None:
+            continue
+        raw_link = link = m.group(2)
+        if is_url(link):
+            link = mangle_url(link)
+        if len(link) <= 0:
+            continue
+        # Set name based on link.
+        # If link already exists, reuse existing reference
+        name = names_by_link.get(link)
+        if not name:
+            # Link is not referenced. Generate name.
+            is_image = begin > 0 and text[begin - 1] == "!"
+            name = suggest_default_link_name(m.group(1), link, is_image)
+        # If name is already in use by a different link, change our name.
+        i = 1
+        name_ = name
+        while links_by_name.get(name, link) != link and i < 999:
+            i += 1
+            name = name_ + str(i)
+
+        link_for_name = existing_links.get(name)
+        if link_for_name and link_for_name != raw_link:
+            raise Exception("Tried to insert a different link with the same name")
+        if name not in links_by_name:
+            definitions.append((name, raw_link))
+        link_spans.append((m.start(2) - 1, m.end(2) + 1, name, name == m.group(1)))
+        # Update local dict for batch operations
+        links_by_name[name] = link
+        names_by_link[link] = name
+
+    # replace links from the end, so earlier positions remain valid
+    replacements = []
+    for begin, end, name, omit_name in link_spans:
+        replacements.append((begin, end, "[]" if omit_name else "[%s]" % name))
+    for begin, end, replacement in reversed(replacements):
+        view.replace(edit, sublime.Region(begin, end), replacement)
+
+    sel = view.sel()
+    sel.clear()
+    offset = 0
+    for begin, end, replacement in replacements:
+        marker = sublime.Region(begin + offset + 1, begin + offset + len(replacement) - 1)
+        offset += len(replacement) - (end - begin)
+        sel.add(marker)
+    if replacements:
+        view.show_at_center(marker)
+
+    if definitions:
+        pos = view.size()
+        lines = ["[%s]: %s\n" % definition for definition in definitions]
+        view.insert(edit, pos, "".join(lines))
+        for (name, _), line in zip(definitions, lines):
+            sel.add(sublime.Region(pos + 1, pos + 1 + len(name)))
+            pos += len(line)
+
+    return len(link_spans)
 
 
 class MdeConvertInlineLinkToReferenceCommand(MdeTextCommand):
@@ -767,61 +931,14 @@ class MdeConvertInlineLinkToReferenceCommand(MdeTextCommand):
     def run(self, edit, name=None):
         """Run command callback."""
         view = self.view
-        re_link_or_embed = r"\[([^\]]+)\]\((?!#)([^\)]+)\)"
-
-        # Remove all whitespace at the end of the file
-        whitespace_at_end = view.find(r"\s*\z", 0)
-        view.replace(edit, whitespace_at_end, "\n")
-
-        # If there is not already a reference list at the end, insert a new line at the end
-        if not view.find(r"\n\s*\[[^\]]*\]:.*\s*\z", 0):
-            view.insert(edit, view.size(), "\n")
-
-        link_spans = []
-        links_by_name = getReferences2(view)
-        names_by_link = {v: k for k, v in links_by_name.items()}
-
+        candidates = []
         for sel in view.sel():
             if not view.match_selector(sel.b, "meta.link.inline"):
                 continue
             start = findScopeFrom(view, sel.b, marker_begin_scope_name, backwards=True)
             end = findScopeFrom(view, sel.b, marker_end_scope_name) + 1
-            text = view.substr(sublime.Region(start, end))
-            m = re.match(re_link_or_embed, text)
-            if m is None:
-                continue
-            text = m.group(1)
-            link = m.group(2)
-            link_span = sublime.Region(start + m.span(2)[0] - 1, start + m.span(2)[1] + 1)
-            if is_url(link):
-                link = mangle_url(link)
-            if len(link) <= 0:
-                continue
-            # Set name based on link.
-            # If link already exists, reuse existing reference
-            name = None
-            if names_by_link.get(link):
-                name = names_by_link.get(link)
-            else:
-                # Link is not referenced. Generate name.
-                is_image = view.substr(start - 1) == "!" if start > 0 else False
-                name = name or suggest_default_link_name(text, link, is_image)
-            # If name is already in use by a different link, change our name.
-            i = 1
-            name_ = name
-            while links_by_name.get(name, link) != link and i < 999:
-                i += 1
-                name = name_ + str(i)
-
-            link_spans.append((link_span, name, name == text))
-            # Update local dict for batch operations
-            links_by_name[name] = link
-            names_by_link[link] = name
-
-        offset = 0
-        for span, name, name_is_text in link_spans:
-            _link_span = sublime.Region(span.a + offset, span.b + offset)
-            offset -= convert2ref(view, edit, _link_span, name, name_is_text)
+            candidates.append((start, end))
+        convert2refs(view, edit, sorted(set(candidates)))
 
 
 class MdeConvertInlineLinksToReferencesCommand(MdeTextCommand):
@@ -830,14 +947,13 @@ class MdeConvertInlineLinksToReferencesCommand(MdeTextCommand):
     def run(self, edit):
         """Run command callback."""
         view = self.view
-        pattern = r"(?<=\]\()(?!#)([^\)]+)(?=\))"
-
-        _sel = []
-        for sel in view.sel():
-            _sel.append(sel)
-        view.sel().clear()
-        view.sel().add_all(view.find_all(pattern))
-        view.run_command("mde_convert_inline_link_to_reference")
+        text = view.substr(sublime.Region(0, view.size()))
+        candidates = []
+        for region in view.find_by_selector("meta.link.inline"):
+            candidates.extend(
+                m.span() for m in INLINE_LINK_RE.finditer(text, region.begin(), region.end())
+            )
+        convert2refs(view, edit, candidates)
 
 
 class MdeAddNumberedReferenceDefinitionCommand(MdeTextCommand):
@@ -896,37 +1012,227 @@ def shorten(string, n):
     return string if len(string) <= n else string[: n - 1] + "…"
 
 
+re_reflinks = re.compile(
+    r"^[ \t>]*\[(?P<id>[^\^][^\]]*)\]:\s+(?P<link>\S*)(?:\s+(?P<desc>.*))?$",
+    re.MULTILINE,
+)
+
+
+def ranked_reference_definitions(view, parsed=None):
+    """Return all reference definitions, most often used first.
+
+    Args:
+        parsed (dict): Definitions parsed by a previous call by the text of their regions.
+            It is updated to the current definitions, so only modified ones are parsed.
+
+    Returns:
+        list: (id, link, description) tuples, in document order for ids used equally often
+    """
+    text = view.substr(sublime.Region(0, view.size()))
+    known = parsed or {}
+    current = {}
+    definitions = []
+    for ref in view.find_by_selector("meta.link.reference.def"):
+        block = text[ref.begin() : ref.end()]
+        found = current.get(block) or known.get(block)
+        if found is None:
+            found = tuple(m.group("id", "link", "desc") for m in re_reflinks.finditer(block))
+        current[block] = found
+        definitions.extend(found)
+    if parsed is not None:
+        parsed.clear()
+        parsed.update(current)
+
+    markers = ReferenceIndex.get(view).markers
+
+    def usage(definition):
+        marker = markers.get(definition[0].lower())
+        return -len(marker.regions) if marker else 0
+
+    definitions.sort(key=usage)
+    return definitions
+
+
+# a marker like [name], [text][name], [name][] or [^name], but not a definition
+MARKER_AT_RE = re.compile(r"\[([^\[\]\n]*)\](?:\[([^\[\]\n]*)\])?(?!:)")
+
+
+def marker_name_at(view, pt):
+    """Return the name of the marker at `pt` or None."""
+    line = view.line(pt)
+    col = pt - line.begin()
+    for m in MARKER_AT_RE.finditer(view.substr(line)):
+        if m.start() <= col < m.end():
+            return m.group(2) or m.group(1)
+        if m.start() > col:
+            break
+    return None
+
+
+class MdeReferencePopupListener(MdeViewEventListener):
+    """
+    Show the body of a footnote or the url and title of a reference link under the mouse.
+
+    Definitions are looked up in the `ReferenceIndex`, which parses the hovered
+    definition only once per ``change_count``. The index is refreshed after
+    `refresh_delay` milliseconds without modifications. Until then, hovering is
+    answered by the outdated index, so it doesn't wait for documents with thousands
+    of definitions to be parsed. Only the first hover of a view builds the index.
+    """
+
+    selector = "text.html.markdown meta.link, text.html.markdown meta.image"
+
+    # maximum number of characters of a footnote to show
+    max_length = 1000
+
+    # milliseconds without modifications before the index is refreshed
+    refresh_delay = 500
+
+    def on_modified_async(self):
+        if self.view.settings().get("mde.reference_popup", True):
+            change_count = self.view.change_count()
+            sublime.set_timeout(lambda: self.refresh(change_count), self.refresh_delay)
+
+    def refresh(self, change_count):
+        """
+        Update the index, if the view is not modified since `change_count`.
+        """
+        if self.view.is_valid() and self.view.change_count() == change_count:
+            ReferenceIndex.get(self.view).definitions
+
+    def on_hover(self, point, hover_zone):
+        view = self.view
+        if (
+            hover_zone != sublime.HOVER_TEXT
+            or not view.settings().get("mde.reference_popup", True)
+            or not view.match_selector(point, self.selector)
+        ):
+            return
+        name = marker_name_at(view, point)
+        if not name:
+            return
+        index = ReferenceIndex.indexes.get(view.id())
+        if index is None:
+            index = ReferenceIndex.get(view)
+        preview = index.preview(name.lower())
+        if preview is None:
+            return
+        if isinstance(preview, tuple):
+            url, title = preview
+            content = '<a href="%s">%s</a>' % (html.escape(url), html.escape(url))
+            if title:
+                content += "<br>%s" % html.escape(title)
+        else:
+            if len(preview) > self.max_length:
+                preview = preview[: self.max_length] + "..."
+            content = "<br>".join(html.escape(line.strip()) for line in preview.split("\n"))
+        view.show_popup(
+            "<body id=mde-reference-popup>%s</body>" % content,
+            sublime.HIDE_ON_MOUSE_MOVE_AWAY,
+            point,
+            max_width=600,
+            on_navigate=lambda href: sublime.run_command("open_url", {"url": href}),
+        )
+
+
+class ReferenceCompletionsProvider(MdeViewEventListener):
+    """
+    Complete reference names from all reference definitions of the view.
+
+    Completions of the view's definitions are brought up to date before each query
+    answered. Only definitions whose text changed are parsed again, the usage ranking
+    comes from the incrementally updated reference index.
+
+    Completions of the workspace index are rebuilt after `refresh_delay` milliseconds
+    without modifications, so typing doesn't wait for thousands of indexed definitions.
+    """
+
+    re_reflinks = re_reflinks
+
+    # milliseconds without modifications before workspace completions are rebuilt
+    refresh_delay = 500
+
+    change_count = None
+    completions = []
+    # definition text -> parsed definitions
+    parsed = None
+    # lower-cased names defined by the view
+    names = frozenset()
+    local_completions = []
+    # the `WorkspaceIndex.names` the workspace completions were built from
+    workspace_names = None
+    workspace_completions = []
+
+    def on_query_completions(self, _, locations):
+        if not self.view.match_selector(
+            locations[0],
+            "text.html.markdown meta.link.reference, text.html.markdown meta.image.reference",
+        ):
+            return None
+
+        self.refresh()
+        return self.completion_list(self.completions)
+
+    def refresh(self):
+        """
+        Rebuild completions of the view's definitions, if it was modified.
+
+        Completions of the workspace index are built right away the first time only.
+        """
+        current = self.view.change_count()
+        modified = current != self.change_count
+        if modified:
+            if self.parsed is None:
+                self.parsed = {}
+            definitions = ranked_reference_definitions(self.view, self.parsed)
+            self.names = set(definition[0].lower() for definition in definitions)
+            self.local_completions = [
+                self.completion_item(ref_id, link, desc) for ref_id, link, desc in definitions
+            ]
+            self.completions = self.local_completions + self.workspace_completions
+            self.change_count = current
+
+        # never blocks, the index is empty until its folders were scanned in the background
+        workspace = WorkspaceIndex.get(self.view)
+        names = workspace.names if workspace else None
+        if self.workspace_names is None and names:
+            self.refresh_workspace(current)
+        elif names is not self.workspace_names or (modified and self.workspace_completions):
+            sublime.set_timeout(lambda: self.refresh_workspace(current), self.refresh_delay)
+
+    def refresh_workspace(self, change_count):
+        """
+        Rebuild workspace completions, if the view is not modified since `change_count`.
+        """
+        if change_count != self.view.change_count():
+            return
+        workspace = WorkspaceIndex.get(self.view)
+        names = workspace.names if workspace else None
+        self.workspace_completions = [
+            self.completion_item(ref_id, link, os.path.basename(file_name))
+            for key, (file_name, ref_id, link, _, _) in (names or {}).items()
+            if key not in self.names
+        ]
+        self.workspace_names = names
+        self.completions = self.local_completions + self.workspace_completions
+
+
 if hasattr(sublime, "KIND_ID_MARKUP"):
 
-    class MdeReferenceCompletionsProvider(MdeViewEventListener):
+    class MdeReferenceCompletionsProvider(ReferenceCompletionsProvider):
         KIND_REFERENCE = (sublime.KIND_ID_MARKUP, "R", "Ref")
 
-        re_reflinks = re.compile(
-            r"^[ \t>]*\[(?P<id>[^\^][^\]]*)\]:\s+(?P<link>\S*)(?:\s+(?P<desc>.*))?$",
-            re.MULTILINE,
-        )
+        def completion_item(self, ref_id, link, desc):
+            return sublime.CompletionItem(
+                trigger=ref_id,
+                completion=ref_id,
+                completion_format=sublime.COMPLETION_FORMAT_TEXT,
+                kind=self.KIND_REFERENCE,
+                annotation=shorten((link or "No link"), 30),
+                details=(desc or "No title").strip(" \t\v\f\r\n'\""),
+            )
 
-        def on_query_completions(self, _, locations):
-            if not self.view.match_selector(
-                locations[0],
-                "text.html.markdown meta.link.reference, "
-                "text.html.markdown meta.image.reference",
-            ):
-                return None
-
-            completions = []
-            for ref in self.view.find_by_selector("meta.link.reference.def"):
-                for match in self.re_reflinks.finditer(self.view.substr(ref)):
-                    completions.append(
-                        sublime.CompletionItem(
-                            trigger=match.group("id"),
-                            completion=match.group("id"),
-                            completion_format=sublime.COMPLETION_FORMAT_TEXT,
-                            kind=self.KIND_REFERENCE,
-                            annotation=shorten((match.group("link") or "No link"), 30),
-                            details=(match.group("desc") or "No title").strip(" \t\v\f\r\n'\""),
-                        )
-                    )
+        def completion_list(self, completions):
             return sublime.CompletionList(
                 completions,
                 sublime.INHIBIT_WORD_COMPLETIONS | sublime.INHIBIT_EXPLICIT_COMPLETIONS,
@@ -935,32 +1241,11 @@ if hasattr(sublime, "KIND_ID_MARKUP"):
 
 else:
 
-    class MdeReferenceCompletionsProvider(MdeViewEventListener):
-        re_reflinks = re.compile(
-            r"^[ \t>]*\[(?P<id>[^\^][^\]]*)\]:\s+(?P<link>\S*)(?:\s+(?P<desc>.*))?$",
-            re.MULTILINE,
-        )
-
-        def on_query_completions(self, _, locations):
-            if not self.view.match_selector(
-                locations[0],
-                "text.html.markdown meta.link.reference, "
-                "text.html.markdown meta.image.reference",
-            ):
-                return None
-
-            completions = []
-            for ref in self.view.find_by_selector("meta.link.reference.def"):
-                for match in self.re_reflinks.finditer(self.view.substr(ref)):
-                    completions.append(
-                        [
-                            match.group("id")
-                            + "\t"
-                            + shorten((match.group("link") or "No link"), 30),
-                            match.group("id"),
-                        ]
-                    )
+    class MdeReferenceCompletionsProvider(ReferenceCompletionsProvider):
+        def completion_item(self, ref_id, link, desc):
+            return [ref_id + "\t" + shorten((link or "No link"), 30), ref_id]
 
+        def completion_list(self, completions):
             return (
                 completions,
                 sublime.INHIBIT_WORD_COMPLETIONS | sublime.INHIBIT_EXPLICIT_COMPLETIONS,
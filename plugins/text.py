@@ -0,0 +1,128 @@
+"""
+Text helpers shared by features.
+
+They neither depend on Sublime Text's API nor on any feature module, so the headless
+lint engine can use them as well.
+"""
+import bisect
+import re
+
+# size of chunks to compare texts by
+CHUNK_SIZE = 0x10000
+
+# the last line of a block, which is followed by a blank line
+BLOCK_END_RE = re.compile(r"^.*[^ \t\n].*\n(?=[ \t]*(?:\n|\Z))", re.M)
+
+# end of a footnote's body, which may contain paragraphs indented by 4 spaces or a tab
+FOOTNOTE_END_RE = re.compile(r"\s*\Z|\n\s*\n(?![ ]{4}|\t)")
+
+# patterns used to locate code without a syntax definition
+FENCED_CODE_RE = re.compile(r"^[ ]{0,3}(`{3,}|~{3,}).*?(?:^[ ]{0,3}\1[`~]*[ \t]*$|\Z)", re.M | re.S)
+CODE_SPAN_RE = re.compile(r"(`+).*?\1", re.S)
+
+
+def common_prefix(a, b):
+    """
+    Return the length of the common prefix of two strings.
+
+    Chunks are compared first, so equal parts are skipped at the speed of `str.__eq__`.
+    """
+    size = min(len(a), len(b))
+    pos = 0
+    while pos < size:
+        n = min(CHUNK_SIZE, size - pos)
+        if a[pos : pos + n] != b[pos : pos + n]:
+            break
+        pos += n
+    while pos < size and a[pos] == b[pos]:
+        pos += 1
+    return pos
+
+
+def common_suffix(a, b, limit):
+    """
+    Return the length of the common suffix of two strings, which is at most `limit`.
+    """
+    size = min(len(a), len(b), limit)
+    pos = 0
+    while pos < size:
+        n = min(CHUNK_SIZE, size - pos)
+        if a[len(a) - pos - n : len(a) - pos] != b[len(b) - pos - n : len(b) - pos]:
+            break
+        pos += n
+    while pos < size and a[len(a) - pos - 1] == b[len(b) - pos - 1]:
+        pos += 1
+    return pos
+
+
+def split_blocks(text):
+    """
+    Split `text` into blocks separated by blank lines.
+
+    Each block but the first one starts with the blank lines in front of it,
+    so blocks are contiguous and never overlap.
+
+    :param text:  The text to split
+
+    :returns:     A list of block begin offsets, followed by the size of `text`
+    """
+    return [0] + [m.end() for m in BLOCK_END_RE.finditer(text)] + [len(text)]
+
+
+class RegionIndex(object):
+    """
+    Sorted, non-overlapping regions to look up text positions in by bisection.
+    """
+
+    def __init__(self, regions=()):
+        self.begins = []
+        self.ends = []
+        for begin, end in sorted(regions):
+            if self.ends and begin <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.begins.append(begin)
+                self.ends.append(end)
+
+    def contains(self, pt):
+        """
+        Return whether `pt` is located within any region.
+        """
+        i = bisect.bisect_right(self.begins, pt) - 1
+        return i >= 0 and pt < self.ends[i]
+
+    def intersects(self, begin, end):
+        """
+        Return whether any region intersects `begin` to `end`.
+        """
+        i = bisect.bisect_right(self.ends, begin)
+        return i < len(self.begins) and self.begins[i] < end
+
+    def within(self, begin, end):
+        """
+        Return all regions intersecting `begin` to `end` relative to `begin`.
+        """
+        regions = []
+        i = bisect.bisect_right(self.ends, begin)
+        while i < len(self.begins) and self.begins[i] < end:
+            regions.append((self.begins[i] - begin, self.ends[i] - begin))
+            i += 1
+        return tuple(regions)
+
+
+def fenced_code_regions(text):
+    """
+    Locate fenced code blocks and code spans of `text`.
+
+    Indented code blocks can't be told from indented paragraphs of footnotes by
+    regular expressions, so only the syntax locates them.
+
+    :returns:  A `RegionIndex` of the regions
+    """
+    regions = []
+    # skip scanning documents without any code
+    if "`" in text:
+        regions += [m.span() for m in CODE_SPAN_RE.finditer(text)]
+    if "`" in text or "~~~" in text:
+        regions += [m.span() for m in FENCED_CODE_RE.finditer(text)]
+    return RegionIndex(regions)
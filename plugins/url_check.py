@@ -0,0 +1,206 @@
+"""
+Check the status of external urls.
+
+Urls are requested by a bounded pool of threads. Each thread keeps one connection
+per host open until the running checks finished, so many links to the same site share
+connections. Statuses are cached for a configurable time and concurrent requests for
+the same url share one check.
+
+It doesn't depend on Sublime Text's API. Commands run `UrlChecker.check()` in a
+worker thread to keep the UI responsive.
+"""
+import concurrent.futures
+import http.client
+import threading
+import time
+import urllib.parse
+
+# status of urls, which couldn't be requested at all
+CONNECTION_FAILED = 0
+
+# maximum number of redirects to follow
+MAX_REDIRECTS = 5
+
+# characters of paths and queries, which are sent as they are
+SAFE_CHARS = "!#$%&'()*+,/:;=?@[]~"
+
+
+def is_broken(status):
+    """
+    Return whether a status returned by `UrlChecker.check()` denotes a broken link.
+    """
+    return status == CONNECTION_FAILED or status >= 400
+
+
+class UrlChecker(object):
+    """
+    A pool of threads requesting urls with a status cache.
+    """
+
+    # keyword arguments of the constructor, which are taken from settings
+    options = ("workers", "timeout", "ttl", "user_agent")
+
+    def __init__(self, workers=8, timeout=10, ttl=3600, user_agent="MarkdownEditing"):
+        """
+        :param workers:     The maximum number of concurrent requests
+        :param timeout:     The number of seconds to wait for a server to respond
+        :param ttl:         The number of seconds to keep statuses in the cache
+        :param user_agent:  The User-Agent header of requests
+        """
+        self.timeout = timeout
+        self.ttl = ttl
+        self.user_agent = user_agent
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        # url -> (time, status, reason)
+        self.cache = {}
+        # url -> future of a running check
+        self.pending = {}
+        # connections of the current worker thread
+        self.local = threading.local()
+        # connections of all worker threads
+        self.connections = []
+        # number of running checks
+        self.active = 0
+
+    def check(self, urls):
+        """
+        Return the status of each of `urls`, which uses the http or https scheme.
+
+        Blocks until all urls are checked, so it must not be called from the UI thread.
+
+        :param urls:  The urls to check, which may contain duplicates
+
+        :returns:     A ``{url: (status, reason)}`` dictionary, with `status` being the
+                      HTTP status code of the last response or `CONNECTION_FAILED`
+        """
+        result = {}
+        futures = {}
+        now = time.time()
+        with self.lock:
+            self.active += 1
+        try:
+            self.collect(urls, now, result, futures)
+            for url, future in futures.items():
+                try:
+                    status, reason = future.result()
+                    with self.lock:
+                        self.cache[url] = (time.time(), status, reason)
+                finally:
+                    with self.lock:
+                        if self.pending.get(url) is future:
+                            del self.pending[url]
+                result[url] = (status, reason)
+        finally:
+            with self.lock:
+                self.active -= 1
+                if not self.active:
+                    self.close_connections()
+        return result
+
+    def collect(self, urls, now, result, futures):
+        """
+        Add cached statuses of `urls` to `result` and the futures of others to `futures`.
+        """
+        with self.lock:
+            for url in set(urls):
+                parts = urllib.parse.urlsplit(url)
+                if parts.scheme not in ("http", "https") or not parts.netloc:
+                    continue
+                entry = self.cache.get(url)
+                if entry and now - entry[0] < self.ttl:
+                    result[url] = entry[1:]
+                    continue
+                future = self.pending.get(url)
+                if future is None:
+                    future = self.pending[url] = self.pool.submit(self.request, url)
+                futures[url] = future
+
+    def close_connections(self):
+        """
+        Close the connections of all worker threads. The caller must hold `lock`.
+        """
+        for connections in self.connections:
+            for connection in connections.values():
+                connection.close()
+            connections.clear()
+
+    def shutdown(self):
+        """
+        Stop the worker threads once running requests finished and close their connections.
+        """
+        self.pool.shutdown(wait=False)
+        with self.lock:
+            if not self.active:
+                self.close_connections()
+
+    def request(self, url):
+        """
+        Request `url` following redirects.
+
+        A HEAD request is sent first. Servers not supporting it are asked by GET.
+
+        :returns:  A tuple of status and reason
+        """
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                status, reason, location = self.send("HEAD", url)
+                if status in (405, 501):
+                    status, reason, location = self.send("GET", url)
+                if status not in (301, 302, 303, 307, 308) or not location:
+                    return status, reason
+                url = urllib.parse.urljoin(url, location)
+            return status, "Too many redirects"
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            # ValueError is raised for urls, which can't be encoded
+            return CONNECTION_FAILED, str(e) or e.__class__.__name__
+
+    def send(self, method, url):
+        """
+        Send a single request over the worker thread's connection to the url's host.
+
+        A request over a kept alive connection, which the server closed meanwhile,
+        is repeated once over a new connection.
+
+        :returns:  A tuple of status, reason and the Location header
+        """
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = urllib.parse.urlunsplit(
+            (
+                "",
+                "",
+                urllib.parse.quote(parts.path or "/", safe=SAFE_CHARS),
+                urllib.parse.quote(parts.query, safe=SAFE_CHARS),
+                "",
+            )
+        )
+        connections = getattr(self.local, "connections", None)
+        if connections is None:
+            connections = self.local.connections = {}
+            with self.lock:
+                self.connections.append(connections)
+        while True:
+            connection = connections.get(key)
+            reused = connection is not None
+            if connection is None:
+                if parts.scheme == "https":
+                    connection = http.client.HTTPSConnection(parts.netloc, timeout=self.timeout)
+                else:
+                    connection = http.client.HTTPConnection(parts.netloc, timeout=self.timeout)
+                connections[key] = connection
+            try:
+                connection.request(method, path, headers={"User-Agent": self.user_agent})
+                response = connection.getresponse()
+                if method == "HEAD":
+                    response.read()
+                else:
+                    # don't download the body
+                    connection.close()
+                    del connections[key]
+                return response.status, response.reason, response.getheader("Location")
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connections.pop(key, None)
+                if not reused:
+                    raise
@@ -0,0 +1,72 @@
+"""
+Classification and normalization of URLs for links and references.
+
+Pasted clipboard contents and all links of bulk conversions are checked and
+normalized by these functions. Patterns are compiled once at import time and
+results of the functions, which parse URLs, are memoized in bounded caches as
+the same links are usually processed several times.
+"""
+import functools
+import re
+import urllib.parse
+
+URL_RE = re.compile(
+    r"""((?:[a-z][\w-]+:(?:/{1,3}|[a-z0-9%])|www\d{0,3}[.]|[a-z0-9.\-]+[.‌​][a-z]{2,4}/)(?:[^\s()<>]+|(([^\s()<>]+|(([^\s()<>]+)))*))+(?:(([^\s()<>]+|(‌​([^\s()<>]+)))*)|[^\s`!()[]{};:'".,<>?«»“”‘’]))""",
+    re.DOTALL,
+)
+DOMAIN_RE = re.compile(r"^([a-z0-9-]+\.)+\w{2,4}", re.IGNORECASE)
+TRAILING_SLASH_RE = re.compile(r"/$")
+
+# string.punctuation minus -.:;<=>_
+NO_PUNCTUATION = str.maketrans("", "", "!\"#$%&'()*+,/?@[\\]^`{|}~")
+
+# number of memoized results per function
+CACHE_SIZE = 1024
+
+
+def is_url(contents):
+    """Return if contents contains an URL."""
+    return URL_RE.search(contents) is not None
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def mangle_url(url):
+    """Mangle URL for links."""
+    url = url.strip()
+    if DOMAIN_RE.match(url):
+        url = "http://" + url
+    return url
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def suggest_default_link_name(name, link, image):
+    """Suggest default link name in camel case, if `name` is small.
+
+    Args:
+        name (str): An existing name, used as a fallback
+        link (str): The link href
+        image (bool): Whether the link points to an image or not. Used for fallback.
+
+    Returns:
+        str: A suggested reference name in CamelCase, or `name`.
+    """
+    ret = ""
+    name_segs = name.translate(NO_PUNCTUATION).split()
+    if len(name_segs) > 1:
+        for word in name_segs:
+            ret += word.capitalize()
+            if len(ret) > 30:
+                break
+        return ("image" if image else "") + ret
+    elif len(name) < 4:
+        try:
+            parseresult = urllib.parse.urlparse(TRAILING_SLASH_RE.sub("", link))
+            doc_name = parseresult.path.split("/")[-1]
+            if doc_name:
+                return doc_name
+            elif parseresult.netloc:
+                return parseresult.netloc
+        except Exception as e:
+            print("Couldn't parse url", name, image, e)
+            return name
+    return name
@@ -0,0 +1,202 @@
+"""
+Index of reference definitions of all markdown files in a window's folders.
+
+It is enabled by the ``"mde.workspace_references"`` setting and feeds reference
+completions, jumping to definitions and reusing already defined links of shared
+link catalogs.
+
+Folders are scanned in the background, when the index is first used. The index is
+empty until that scan finished. Later scans run at most every
+`WorkspaceIndex.refresh_interval` seconds and only read files whose modification
+time changed. Saved files are updated right away. Hidden folders and those matching
+the ``"folder_exclude_patterns"`` setting are skipped.
+
+Exported listeners:
+    MdeWorkspaceIndexListener
+"""
+import os
+import re
+import sublime
+import sublime_plugin
+import threading
+import time
+
+from .lint.core import find_files, is_excluded_folder
+
+DEFINITION_RE = re.compile(r"^[ \t>]*\[([^\^\]][^\]]*)\]:\s+(?:<([^>]+)>|(\S+))", re.M)
+
+
+def parse_definitions(text):
+    """
+    Find all reference definitions of a markdown document.
+
+    Footnotes are not included. Only the first one of equally named definitions is kept.
+
+    :param text:  The text of the document
+
+    :returns:     A ``{name: (id, url, row, col)}`` dictionary with lower-cased names
+                  and zero-based row and column of the ids
+    """
+    definitions = {}
+    row, pos = 0, 0
+    for match in DEFINITION_RE.finditer(text):
+        begin = match.start(1)
+        row += text.count("\n", pos, begin)
+        pos = begin
+        key = match.group(1).lower()
+        if key not in definitions:
+            col = begin - text.rfind("\n", 0, begin) - 1
+            definitions[key] = (match.group(1), match.group(2) or match.group(3), row, col)
+    return definitions
+
+
+class WorkspaceIndex(object):
+    """
+    Reference definitions of all markdown files in a set of folders.
+    """
+
+    # window id -> index
+    indexes = {}
+    lock = threading.Lock()
+
+    # seconds before files are checked for modifications again
+    refresh_interval = 10
+
+    extensions = (".md", ".mdown", ".markdown")
+
+    @classmethod
+    def get(cls, view):
+        """
+        Return the index of the folders of the view's window.
+
+        :returns:  ``None`` if the index is disabled or the window has no folders
+        """
+        if not view.settings().get("mde.workspace_references", False):
+            return None
+        window = view.window()
+        if window is None or not window.folders():
+            return None
+
+        folders = tuple(window.folders())
+        exclude = tuple(view.settings().get("folder_exclude_patterns") or ())
+        with cls.lock:
+            index = cls.indexes.get(window.id())
+            if index is None or index.folders != folders or index.exclude != exclude:
+                index = cls.indexes[window.id()] = cls(folders, exclude)
+        index.refresh()
+        return index
+
+    def __init__(self, folders, exclude=()):
+        self.folders = folders
+        self.exclude = exclude
+        # serializes scans and updates, which run on the async thread
+        self.write_lock = threading.Lock()
+        # Writers never mutate the following dictionaries, but replace them by new ones.
+        # Readers on the main thread can therefore iterate them without locking.
+        #
+        # file name -> (mtime, definitions)
+        self.files = {}
+        # name -> (file name, id, url, row, col)
+        self.names = {}
+        # url -> id
+        self.urls = {}
+        self.scanned = None
+        self.scanning = False
+
+    def refresh(self):
+        """
+        Scan folders in the background, if they were never scanned or the last scan is outdated.
+        """
+        if self.scanning:
+            return
+        if self.scanned is None or time.time() - self.scanned > self.refresh_interval:
+            self.scanning = True
+            sublime.set_timeout_async(self.scan)
+
+    def scan(self):
+        """
+        Read all markdown files, which were modified since the last scan.
+        """
+        files = {}
+        try:
+            with self.write_lock:
+                for file_name in find_files(self.folders, self.extensions, self.exclude):
+                    entry = self.read(file_name, self.files.get(file_name))
+                    if entry:
+                        files[file_name] = entry
+                self.files = files
+                self.build()
+        finally:
+            self.scanned = time.time()
+            self.scanning = False
+
+    def update(self, file_name):
+        """
+        Read a single file, if it is located in one of the folders.
+        """
+        if os.path.splitext(file_name)[1] not in self.extensions:
+            return
+        for folder in self.folders:
+            if file_name.startswith(os.path.join(folder, "")):
+                break
+        else:
+            return
+        names = os.path.relpath(os.path.dirname(file_name), folder).split(os.sep)
+        if any(is_excluded_folder(name, self.exclude) for name in names if name != os.curdir):
+            return
+        with self.write_lock:
+            files = dict(self.files)
+            entry = self.read(file_name, files.get(file_name))
+            if entry:
+                files[file_name] = entry
+            else:
+                files.pop(file_name, None)
+            self.files = files
+            self.build()
+
+    def read(self, file_name, entry=None):
+        """
+        Return the ``(mtime, definitions)`` of a file, reusing `entry` if the file is unmodified.
+        """
+        try:
+            mtime = os.stat(file_name).st_mtime
+            if entry and entry[0] == mtime:
+                return entry
+            with open(file_name, encoding="utf-8", errors="replace") as f:
+                return (mtime, parse_definitions(f.read()))
+        except OSError:
+            return None
+
+    def build(self):
+        names = {}
+        urls = {}
+        for file_name in sorted(self.files):
+            for key, (ref_id, url, row, col) in self.files[file_name][1].items():
+                names.setdefault(key, (file_name, ref_id, url, row, col))
+                urls.setdefault(url, ref_id)
+        self.names = names
+        self.urls = urls
+
+    def definition(self, name):
+        """
+        Return the ``(file name, id, url, row, col)`` of a definition or ``None``.
+        """
+        return self.names.get(name.lower())
+
+    def name_of(self, url):
+        """
+        Return the id of the first definition of `url` or ``None``.
+        """
+        return self.urls.get(url)
+
+
+class MdeWorkspaceIndexListener(sublime_plugin.EventListener):
+    """Update saved files in workspace indexes."""
+
+    def on_post_save_async(self, view):
+        file_name = view.file_name()
+        window = view.window()
+        if file_name and window:
+            index = WorkspaceIndex.indexes.get(window.id())
+            if index is not None and index.scanned is not None:
+                index.update(file_name)
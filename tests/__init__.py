@@ -1,4 +1,5 @@
 import sublime
+import time
 
 from textwrap import dedent
 from unittesting import DeferrableTestCase
@@ -124,3 +125,32 @@ class DereferrablePanelTestCase(DeferrableTestCase):
         :param col:  The natural 1-based column number. 1=first column
         """
         self.assertEqual(self.view.sel()[0].begin(), self.textPoint(row, col))
+
+
+class BenchmarkTestCase(DereferrablePanelTestCase):
+    """
+    Base class of benchmarks, which print timings of operations on generated documents.
+
+    Benchmarks are not run with the unit tests. Run them from the console by
+
+        sublime.run_command("unit_testing", {"package": "MarkdownEditing", "pattern": "bench_*.py"})
+
+    and read the timings in the console.
+    """
+
+    def measure(self, label, func, number=1):
+        """
+        Call `func` `number` times and print the average time per call.
+
+        :param label:   The description of what is measured
+        :param func:    The function to call without arguments
+        :param number:  The number of calls
+
+        :returns:       The result of the last call
+        """
+        begin = time.perf_counter()
+        for _ in range(number):
+            result = func()
+        elapsed = (time.perf_counter() - begin) / number
+        print("%s: %s: %.3f ms" % (self.__class__.__name__, label, elapsed * 1000))
+        return result
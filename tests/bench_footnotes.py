@@ -0,0 +1,53 @@
+import random
+
+from MarkdownEditing.tests import BenchmarkTestCase
+from MarkdownEditing.plugins.footnotes import FootnoteRegions, reorganize_footnotes
+
+
+class BenchFootnotes(BenchmarkTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rnd = random.Random(1)
+        words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do".split()
+        paragraphs = []
+        size = count = 0
+        while size < 3000000:
+            paragraph = " ".join(rnd.choice(words) for _ in range(300))
+            if count < 1500 and rnd.random() < 0.9:
+                count += 1
+                paragraph += " [^%d]." % count
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 2
+        paragraphs.extend("[^%d]: note %d" % (i, i) for i in range(1, count + 1))
+        self.setText("\n\n".join(paragraphs) + "\n")
+
+    def tearDown(self):
+        FootnoteRegions.discard(self.view)
+        super().tearDown()
+
+    def test_keystrokes(self):
+        """
+        Update footnote regions of a 3 MB manuscript after each of 200 keystrokes.
+        """
+        FootnoteRegions.discard(self.view)
+        tracker = self.measure("first scan", lambda: FootnoteRegions.get(self.view))
+        text = self.getText()
+        self.measure("full scan", lambda: tracker.scan(self.view, text), 10)
+
+        self.view.sel().clear()
+        self.view.sel().add(self.view.size() // 2)
+
+        def keystroke():
+            self.view.run_command("insert", {"characters": "x"})
+            tracker.update(self.view)
+
+        self.measure("update after a keystroke, including the keystroke", keystroke, 200)
+
+    def test_reorganize(self):
+        """
+        Reorganize footnotes of a 3 MB manuscript.
+        """
+        text = self.getText()
+        self.measure("reorganize", lambda: reorganize_footnotes(text), 10)
+        self.measure("reorganize and renumber", lambda: reorganize_footnotes(text, True), 10)
@@ -0,0 +1,49 @@
+import random
+
+import sublime
+
+from MarkdownEditing.tests import BenchmarkTestCase
+from MarkdownEditing.plugins.folding import sections_to_fold
+from MarkdownEditing.plugins.headings.common import HeadingOutline, all_headings
+
+
+class BenchHeadings(BenchmarkTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rnd = random.Random(1)
+        parts = []
+        for i in range(20000):
+            level = rnd.randint(1, 4)
+            parts.append("#" * level + " Heading %d\n\nSome paragraph text for section %d.\n" % (i, i))
+            if i % 500 == 0:
+                parts.append("```\n# not a heading\n```\n")
+        self.setText("\n".join(parts))
+
+    def tearDown(self):
+        HeadingOutline.discard(self.view)
+        super().tearDown()
+
+    def test_all_headings(self):
+        """
+        List 20k headings of a 1.1 MB document.
+        """
+        HeadingOutline.discard(self.view)
+        self.measure("first parse", lambda: all_headings(self.view))
+        self.measure("unmodified view", lambda: all_headings(self.view), 100)
+
+        self.view.sel().clear()
+        self.view.sel().add(self.view.size() // 2)
+
+        def keystroke():
+            self.view.run_command("insert", {"characters": "x"})
+            return all_headings(self.view)
+
+        self.measure("after a keystroke, including the keystroke", keystroke, 20)
+
+    def test_fold_all_sections(self):
+        """
+        Find sections of 20k headings to fold.
+        """
+        region = sublime.Region(0, self.view.size())
+        self.measure("fold level 2", lambda: list(sections_to_fold(self.view, region, 2)), 5)
@@ -0,0 +1,61 @@
+from MarkdownEditing.tests import BenchmarkTestCase
+from MarkdownEditing.plugins.lint.commands import ViewDocument
+from MarkdownEditing.plugins.lint.core import Document, Linter, load_settings, mddef
+
+
+class BenchLintExcludedRegions(BenchmarkTestCase):
+
+    def test_excluded_regions(self):
+        """
+        Lint a document with many findings in front of, within and behind code blocks.
+
+        Findings within front matter and code blocks are dropped by looking them up
+        in the regions of two `find_by_selector()` calls.
+        """
+        paragraph = "Text with trailing spaces  \n" * 8
+        code = "    code with trailing spaces  \n" * 8
+        fence = "```\ncode with trailing spaces  \n```\n"
+        self.setText(
+            "---\ntitle: Benchmark  \n---\n\n"
+            + "".join("# Section %d\n\n%s\n%s\n%s\n" % (i, paragraph, code, fence) for i in range(450))
+        )
+        settings = load_settings()
+        result = self.measure(
+            "full lint of %d kB" % (self.view.size() // 1024),
+            lambda: Linter().run(ViewDocument(self.view), settings),
+        )
+        print("%d findings" % len(result))
+
+        linter = Linter()
+        linter.run(ViewDocument(self.view), settings, incremental=True)
+        self.view.sel().clear()
+        self.view.sel().add(self.view.size() // 2)
+        self.view.run_command("insert", {"characters": "x"})
+        self.measure(
+            "incremental lint after a keystroke",
+            lambda: linter.run(ViewDocument(self.view), settings, incremental=True),
+        )
+
+
+class BenchLintLists(BenchmarkTestCase):
+
+    def test_list_rules(self):
+        """
+        Lint documents with many short lists by the list rules only.
+
+        List items are matched in place instead of in a copy of the rest of the document.
+        """
+        rules = ("md004", "md005", "md006", "md007", "md029")
+        settings = dict(load_settings())
+        settings["disable"] = [
+            rule.__name__ for rule in mddef.__subclasses__() if rule.__name__ not in rules
+        ]
+        for items in (1000, 10000, 100000):
+            # lists of two items separated by paragraphs
+            text = "".join(
+                "Para %d\n\n* item\n* item\n\n1. one\n2. two\n\n" % i for i in range(items // 4)
+            )
+            self.measure(
+                "%d list items" % items,
+                lambda: Linter().run(Document(text, {"tab_size": 4}), settings),
+            )
@@ -0,0 +1,95 @@
+import random
+
+from MarkdownEditing.tests import BenchmarkTestCase
+from MarkdownEditing.plugin import MdeReferenceCompletionsProvider
+from MarkdownEditing.plugins.reference_index import ScopeIndex
+from MarkdownEditing.plugins.references import findScopeFrom, getCurrentScopeRegion
+
+
+class BenchScopeIndex(BenchmarkTestCase):
+
+    def test_find_scope(self):
+        """
+        Search a selector, which doesn't match anywhere in a 200k character buffer.
+        """
+        self.setText(("Plain text without any links. " * 40 + "\n\n") * 165)
+        selector = "markup.underline.link.markdown"
+
+        def first():
+            ScopeIndex.discard(self.view)
+            return findScopeFrom(self.view, 0, selector)
+
+        size = self.view.size()
+        self.measure("findScopeFrom() in %d characters, first call" % size, first)
+        self.measure(
+            "findScopeFrom() in %d characters, later calls" % size,
+            lambda: findScopeFrom(self.view, 0, selector),
+            1000,
+        )
+
+    def test_scope_extent(self):
+        """
+        Find the extent of a 20k character url from its middle.
+        """
+        self.setText("[link]: https://example.com/%s\n" % ("x" * 20000))
+        pt = self.view.size() // 2
+
+        def first():
+            ScopeIndex.discard(self.view)
+            return getCurrentScopeRegion(self.view, pt)
+
+        self.measure("getCurrentScopeRegion() in a 20k character run, first call", first)
+        self.measure(
+            "getCurrentScopeRegion() in a 20k character run, later calls",
+            lambda: getCurrentScopeRegion(self.view, pt),
+            1000,
+        )
+
+
+class BenchReferenceOrganize(BenchmarkTestCase):
+
+    def test_organize(self):
+        """
+        Sort thousands of shuffled definitions.
+        """
+        for count in (2000, 10000):
+            definitions = ["[ref%d]: https://example.com/%d" % (i, i) for i in range(count)]
+            random.Random(1).shuffle(definitions)
+            self.setText(
+                "".join("Paragraph %d uses [link][ref%d].\n\n" % (i, i) for i in range(count))
+                + "\n".join(definitions)
+                + "\n"
+            )
+            self.measure(
+                "organize %d definitions" % count,
+                lambda: self.view.run_command("mde_reference_organize"),
+            )
+
+
+class BenchReferenceCompletions(BenchmarkTestCase):
+
+    def test_completions(self):
+        """
+        Query completions in a document with 20k paragraphs and 20k definitions.
+        """
+        count = 20000
+        self.setText(
+            "".join("Paragraph %d uses [x][ref%d].\n\n" % (i, i % 97) for i in range(count))
+            + "".join(
+                '[ref%d]: https://example.com/%d "Title %d"\n' % (i, i, i) for i in range(count)
+            )
+        )
+        pt = self.getText().index("][ref") + 3
+        provider = MdeReferenceCompletionsProvider(self.view)
+        self.measure("first query", lambda: provider.on_query_completions("", [pt]))
+        self.measure(
+            "query of an unmodified view", lambda: provider.on_query_completions("", [pt]), 100
+        )
+
+        def modified():
+            self.view.run_command("insert", {"characters": "x"})
+            return provider.on_query_completions("", [pt])
+
+        self.view.sel().clear()
+        self.view.sel().add(self.view.size())
+        self.measure("query after a keystroke, including the keystroke", modified, 20)
@@ -0,0 +1,33 @@
+from MarkdownEditing.tests import BenchmarkTestCase
+from MarkdownEditing.plugins.urls import is_url, mangle_url, suggest_default_link_name
+
+
+class BenchUrls(BenchmarkTestCase):
+
+    def run_urls(self, label, urls):
+        mangle_url.cache_clear()
+        suggest_default_link_name.cache_clear()
+
+        def convert():
+            for url in urls:
+                if is_url(url):
+                    suggest_default_link_name("Link to a page", mangle_url(url), False)
+
+        self.measure(label, convert)
+
+    def test_distinct_urls(self):
+        """
+        Convert 100k distinct links.
+        """
+        self.run_urls(
+            "100k distinct urls", ["www.example.com/page/%d.html" % i for i in range(100000)]
+        )
+
+    def test_repeated_urls(self):
+        """
+        Convert 100k links, drawn from 1k distinct ones.
+        """
+        self.run_urls(
+            "100k urls of 1k distinct ones",
+            ["www.example.com/page/%d.html" % (i % 1000) for i in range(100000)],
+        )
@@ -444,3 +444,23 @@ class TestConvertInlineLinkToReferenceReuseExistingDefinitions(DereferrablePanel
             [GitHub2]: https://github.com/user
             """
         )
+
+
+class TestConvertInlineLinksToReferences(DereferrablePanelTestCase):
+    def test_convert_all_reusing_names(self):
+        self.setBlockText(
+            """
+            [GitHub](https://github.com) and [the hub](https://github.com).
+            [Issues](https://github.com/user/repo/issues) go here.
+            """
+        )
+        self.view.run_command("mde_convert_inline_links_to_references")
+        self.assertEqualBlockText(
+            """
+            [GitHub][] and [the hub][GitHub].
+            [Issues][] go here.
+
+            [GitHub]: https://github.com
+            [Issues]: https://github.com/user/repo/issues
+            """
+        )
@@ -1,3 +1,12 @@
+import unittest
+
+from MarkdownEditing.plugins.footnotes import (
+    DEFINITION_KEY,
+    REFERENCE_KEY,
+    FootnoteRegions,
+    get_footnote_model,
+    reorganize_footnotes,
+)
 from MarkdownEditing.tests import DereferrablePanelTestCase
 
 
@@ -76,3 +85,107 @@ class TestMdeReferenceNewFootnoteCommand(DereferrablePanelTestCase):
             [^2]:\x20
             """
         )
+
+
+class TestFootnoteRegions(DereferrablePanelTestCase):
+
+    def test_update(self):
+        FootnoteRegions.discard(self.view)
+        self.setBlockText(
+            """
+            Text[^1] and[^2].
+
+            [^1]: One
+            [^2]: Two
+            """
+        )
+        regions = FootnoteRegions.get(self.view)
+        self.assertEqual(regions.references, [(4, 8), (12, 16), (19, 23), (29, 33)])
+        self.assertEqual(regions.definitions, [(19, 24), (29, 34)])
+
+        self.setCaretTo(1, 5)
+        self.view.run_command("insert", {"characters": "[^3]"})
+        self.view.run_command("move_to", {"to": "eof"})
+        self.view.run_command("insert", {"characters": "\n[^3]: Three"})
+        regions = FootnoteRegions.get(self.view)
+        self.assertEqual(
+            regions.references, [(4, 8), (8, 12), (16, 20), (23, 27), (33, 37), (43, 47)]
+        )
+        self.assertEqual(regions.definitions, [(23, 28), (33, 38), (43, 48)])
+        self.assertEqual(
+            [(r.begin(), r.end()) for r in self.view.get_regions(REFERENCE_KEY)],
+            regions.references,
+        )
+        self.assertEqual(
+            [(r.begin(), r.end()) for r in self.view.get_regions(DEFINITION_KEY)],
+            regions.definitions,
+        )
+
+    def test_model(self):
+        self.setBlockText(
+            """
+            Text[^1] and[^2] or[^note][^2].
+
+            [^1]: One [^note]
+            [^note]: Note
+            """
+        )
+        model = get_footnote_model(self.view)
+        self.assertEqual(sorted(model.references), ["1", "2", "note"])
+        self.assertEqual(len(model.references["2"]), 2)
+        self.assertEqual(sorted(model.definitions), ["1", "note"])
+        self.assertEqual(model.last_number, 2)
+        self.assertIs(get_footnote_model(self.view), model)
+
+        self.setCaretTo(1, 23)
+        self.view.run_command("mde_goto_footnote_definition")
+        self.assertEqual(self.view.sel()[0], model.definitions["note"])
+
+
+class TestReorganizeFootnotes(unittest.TestCase):
+
+    text = (
+        "Intro[^b] text[^a].\n\n"
+        "[^a]: Note a\n\n    second paragraph of a[^c]\n\n"
+        "Middle[^b] and[^d].\n\n"
+        "[^b]: Note b\n"
+        "[^z]: Unused\n"
+        "[^c]: Note c\n"
+    )
+
+    def test_sort(self):
+        self.assertEqual(
+            reorganize_footnotes(self.text),
+            "Intro[^b] text[^a].\n\n"
+            "Middle[^b] and[^d].\n\n"
+            " [^b]: Note b\n\n"
+            " [^a]: Note a\n\n    second paragraph of a[^c]\n\n"
+            " [^c]: Note c\n\n"
+            " [^z]: Unused",
+        )
+
+    def test_renumber(self):
+        self.assertEqual(
+            reorganize_footnotes(self.text, renumber=True),
+            "Intro[^1] text[^2].\n\n"
+            "Middle[^1] and[^3].\n\n"
+            " [^1]: Note b\n\n"
+            " [^2]: Note a\n\n    second paragraph of a[^4]\n\n"
+            " [^4]: Note c\n\n"
+            " [^5]: Unused",
+        )
+
+    def test_code(self):
+        text = (
+            "Text[^2] and `[^1]`.\n\n"
+            "```\n[^1]: not a definition[^2]\n```\n\n"
+            "[^2]: Note 2\n"
+            "[^1]: Note 1\n"
+        )
+        self.assertEqual(
+            reorganize_footnotes(text, renumber=True),
+            "Text[^1] and `[^1]`.\n\n"
+            "```\n[^1]: not a definition[^2]\n```\n\n"
+            " [^1]: Note 2\n\n"
+            " [^2]: Note 1",
+        )
@@ -0,0 +1,37 @@
+from MarkdownEditing.tests import DereferrablePanelTestCase
+from MarkdownEditing.plugins.headings import HeadingOutline, all_headings
+
+
+class TestHeadingOutline(DereferrablePanelTestCase):
+
+    def setUp(self):
+        HeadingOutline.discard(self.view)
+        self.setBlockText(
+            """
+            # One
+
+            text
+
+            Two
+            ---
+
+            ## Three
+            """
+        )
+
+    def test_all_headings(self):
+        self.assertEqual(all_headings(self.view), [(0, 5, 1), (13, 20, 2), (22, 30, 2)])
+        self.assertEqual(all_headings(self.view, 6, 21), [(13, 20, 2)])
+
+    def test_update(self):
+        all_headings(self.view)
+        self.setCaretTo(3, 5)
+        self.view.run_command("insert", {"characters": "\n# New"})
+        self.assertEqual(
+            all_headings(self.view), [(0, 5, 1), (12, 17, 1), (19, 26, 2), (28, 36, 2)]
+        )
+
+        # an unterminated fenced code block hides all headings behind it
+        self.setCaretTo(3, 1)
+        self.view.run_command("insert", {"characters": "```\n"})
+        self.assertEqual(all_headings(self.view), [(0, 5, 1)])
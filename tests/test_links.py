@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from MarkdownEditing.plugins.lint.links import (
+    Resolver,
+    check_file,
+    check_links,
+    find_anchors,
+    find_links,
+)
+
+
+class TestLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="mde")
+        os.mkdir(os.path.join(self.folder, "sub"))
+        self.write(
+            "sub/other.md", "# Other Page\n\n## Usage & Setup\n\nSection\n---\n\n## Usage & Setup\n"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, name, text):
+        file_name = os.path.join(self.folder, name)
+        with open(file_name, "w", encoding="utf-8") as f:
+            f.write(text)
+        return file_name
+
+    def test_find_anchors(self):
+        self.assertEqual(
+            find_anchors(
+                '# Title {#custom}\n\n```\n# Code\n```\n\n# Title\n\n<a name="here"></a>\n'
+            ),
+            {"custom", "title", "title-1", "here"},
+        )
+
+    def test_find_links(self):
+        self.assertEqual(
+            find_links('[a](x.md) ![b](<y z.png> "title")\n`[c](code.md)`\n\n[d]: w.md#e\n'),
+            [(4, "x.md"), (16, "y z.png"), (55, "w.md#e")],
+        )
+
+    def test_check_links(self):
+        text = (
+            "# Title\n\n"
+            "[ok](sub/other.md#usage--setup-1) [dir](sub/) [web](https://example.com)\n"
+            "[file](sub/missing.md) [anchor](sub/other.md#nope) [self](#title) [no](#nope)\n\n"
+            "[ref]: sub/other.md#section\n"
+            "[abs]: /sub/other.md\n"
+        )
+        file_name = os.path.join(self.folder, "index.md")
+        resolver = Resolver()
+        self.assertEqual(
+            [
+                (problem, destination)
+                for _, problem, destination in check_links(text, file_name, resolver)
+            ],
+            [
+                ("missing file", "sub/missing.md"),
+                ("missing anchor", "sub/other.md#nope"),
+                ("missing anchor", "#nope"),
+            ],
+        )
+        self.assertEqual(
+            len(check_links(text, file_name, resolver, root=os.path.join(self.folder, "sub"))), 4
+        )
+
+    def test_check_file(self):
+        file_name = os.path.join(self.folder, "bad.md")
+        with open(file_name, "wb") as f:
+            f.write(b"\xff\xfe[a](missing.md)\n")
+        self.assertEqual(
+            check_file(file_name, Resolver()),
+            (file_name, ["line 1: missing file, missing.md"]),
+        )
+        missing = os.path.join(self.folder, "gone.md")
+        self.assertEqual(len(check_file(missing, Resolver())[1]), 1)
+
+    def test_resolver_cache(self):
+        resolver = Resolver()
+        other = os.path.join(self.folder, "sub", "other.md")
+        anchors = resolver.anchors_of(other)
+        self.assertIs(resolver.anchors_of(other), anchors)
+        self.assertFalse(resolver.exists(os.path.join(self.folder, "sub", "new.md")))
+
+        self.write("sub/new.md", "# New\n")
+        mtime = os.stat(other).st_mtime + 1
+        os.utime(os.path.join(self.folder, "sub"), (mtime, mtime))
+        self.assertTrue(resolver.exists(os.path.join(self.folder, "sub", "new.md")))
+
+        self.write("sub/other.md", "# Changed\n")
+        os.utime(other, (mtime, mtime))
+        self.assertEqual(resolver.anchors_of(other), {"changed"})
@@ -0,0 +1,288 @@
+import os
+import stat
+import sublime
+import tempfile
+import unittest
+
+from MarkdownEditing.tests import DereferrablePanelTestCase
+from MarkdownEditing.plugins.lint.commands import config_file_stats
+from MarkdownEditing.plugins.lint.core import (
+    Document,
+    Linter,
+    format_result,
+    load_settings,
+)
+
+
+class TestMdeMarkdownLintCommand(DereferrablePanelTestCase):
+
+    def lint(self, **args):
+        self.view.run_command("mde_markdown_lint", args)
+        panel = self.window.find_output_panel("mde")
+        if panel is None:
+            return ""
+        return panel.substr(sublime.Region(0, panel.size()))
+
+    def test_heading_rules(self):
+        self.setBlockText(
+            """
+            # Title
+
+            ### Sub
+
+            Text
+
+            # Title
+            """
+        )
+        self.assertEqual(
+            self.lint(),
+            "line 3: MD001 - Header levels should only increment by one level at a time, expected 2, 3 found\n"
+            "line 7: MD024 - Multiple headers with the same content, 'Title' duplicated\n"
+            "line 7: MD025 - Multiple top level headers in the same document, 2 found\n"
+        )
+
+    def test_list_rules(self):
+        self.setText("# Title\n\n* one\n+ two\n   - three\n\n1. one\n3. three\n")
+        self.assertEqual(
+            self.lint(),
+            "line 4: MD004 - Unordered list style, * expected, + found\n"
+            "line 5: MD007 - Unordered list indentation, 4*n expected, 3 found\n"
+            "line 8: MD029 - Ordered list item prefix, '3' found, '2' expected\n"
+        )
+
+    def test_blank_line_and_quote_rules(self):
+        self.setText("# Title\n\n\n\nText  \n\n>  quote\n\n> quote\n")
+        self.assertEqual(
+            self.lint(),
+            "line 2: MD012 - Multiple consecutive blank lines, 3 blank lines\n"
+            "line 5: MD009 - Trailing spaces, 2 spaces\n"
+            "line 7: MD027 - Multiple spaces after blockquote symbol, too many spaces\n"
+            "line 7: MD028 - Blank line inside blockquote, found one\n"
+        )
+
+    def test_no_errors(self):
+        self.setBlockText(
+            """
+            # Title
+
+            Text
+            """
+        )
+        self.assertEqual(self.lint(), "")
+
+    def test_incremental(self):
+        self.setBlockText(
+            """
+            # Title
+
+            ### Sub
+
+            Text
+            """
+        )
+        expected = (
+            "line 3: MD001 - Header levels should only increment by one level at a time, expected 2, 3 found\n"
+        )
+        self.assertEqual(self.lint(incremental=True), expected)
+        self.assertEqual(self.lint(incremental=True), expected)
+
+        self.setCaretTo(5, 5)
+        self.view.run_command("insert", {"characters": "\n\n# Title"})
+        expected += (
+            "line 7: MD024 - Multiple headers with the same content, 'Title' duplicated\n"
+            "line 7: MD025 - Multiple top level headers in the same document, 2 found\n"
+        )
+        self.assertEqual(self.lint(incremental=True), expected)
+        self.assertEqual(self.lint(), expected)
+
+    def test_fix(self):
+        self.setText("#Title\n\n\n\n##  Sub  \n\n  # Third\n\n*   item\n")
+        self.assertEqual(
+            self.lint(fix=True),
+            "line 5: MD025 - Multiple top level headers in the same document, 2 found\n"
+        )
+        self.assertEqual(self.getText(), "# Title\n\n## Sub\n\n# Third\n\n* item\n")
+        self.view.run_command("undo")
+        self.assertEqual(self.getText(), "#Title\n\n\n\n##  Sub  \n\n  # Third\n\n*   item\n")
+
+    def test_profile(self):
+        self.setText("# Title\n\nText  \n")
+        lines = self.lint(profile="table").splitlines()
+        self.assertEqual(lines[0], "line 3: MD009 - Trailing spaces, 2 spaces")
+        self.assertEqual(lines[1], "")
+        self.assertEqual(lines[2].split(), ["rule", "time", "[ms]", "matches", "selector", "checks", "diagnostics"])
+        self.assertIn("MD009", [line.split()[0] for line in lines[3:]])
+
+    def test_regions(self):
+        self.setText("# Title\n\nText  \n")
+        self.lint()
+        self.assertEqual(self.view.get_regions("mde.lint.md009"), [sublime.Region(13, 15)])
+
+        self.setText("# Title\n\nText\n")
+        self.lint()
+        self.assertEqual(self.view.get_regions("mde.lint.md009"), [])
+
+    def test_cached_result_depends_on_settings(self):
+        self.setText("# Title\n\nText  \n")
+        expected = "line 3: MD009 - Trailing spaces, 2 spaces\n"
+        self.assertEqual(self.lint(), expected)
+        self.assertEqual(self.lint(), expected)
+
+        settings = self.view.settings()
+        lint = settings.get("mde.lint")
+        lint["disable"] = lint["disable"] + ["md009"]
+        settings.set("mde.lint", lint)
+        self.addCleanup(settings.erase, "mde.lint")
+        self.assertEqual(self.lint(), "")
+
+    def test_cached_result_depends_on_view_settings(self):
+        self.setText("# Title\n\n" + "word " * 19 + "word\n")
+        settings = self.view.settings()
+        lint = settings.get("mde.lint")
+        lint["disable"] = []
+        settings.set("mde.lint", lint)
+        self.addCleanup(settings.erase, "mde.lint")
+        settings.set("wrap_width", 120)
+        self.addCleanup(settings.erase, "wrap_width")
+        self.assertEqual(self.lint(), "")
+        self.assertEqual(self.lint(incremental=True), "")
+
+        settings.set("wrap_width", 80)
+        expected = "line 3: MD013 - Line length, 99 characters\n"
+        self.assertEqual(self.lint(), expected)
+        self.assertEqual(self.lint(incremental=True), expected)
+
+    def mdl_stub(self, delay=0):
+        fd, stub = tempfile.mkstemp(prefix="mdl")
+        with os.fdopen(fd, "w") as f:
+            f.write('#!/bin/sh\ncat >/dev/null\nsleep %s\necho "(stdin):1: MD041 stub"\n' % delay)
+        os.chmod(stub, stat.S_IRWXU)
+        self.addCleanup(os.remove, stub)
+
+        self.view.settings().set("mde.lint", {"mdl": {"executable": stub, "timeout": 5}})
+        self.addCleanup(self.view.settings().erase, "mde.lint")
+        self.window.destroy_output_panel("mde")
+
+    @unittest.skipIf(sublime.platform() == "windows", "stub requires a posix shell")
+    def test_mdl(self):
+        self.mdl_stub()
+        self.setText("Text\n")
+        self.view.run_command("mde_markdown_lint_mdl")
+        yield lambda: self.window.find_output_panel("mde") is not None
+        panel = self.window.find_output_panel("mde")
+        self.assertEqual(panel.substr(sublime.Region(0, panel.size())), "1: MD041 stub")
+
+    @unittest.skipIf(sublime.platform() == "windows", "stub requires a posix shell")
+    def test_mdl_stale_result(self):
+        self.mdl_stub(delay=0.5)
+        self.setText("Text\n")
+        self.view.run_command("mde_markdown_lint_mdl")
+        self.view.run_command("insert", {"characters": "More"})
+        yield 1000
+        self.assertIsNone(self.window.find_output_panel("mde"))
+
+
+class TestLintCore(unittest.TestCase):
+
+    def test_document_selectors(self):
+        text = "---\ntitle: x\n---\n# Title\n\n    code\n    code\nText\n\n* item\n\n    para\n"
+        document = Document(text)
+        self.assertEqual(document.find_by_selector(Linter.frontmatter), [(0, 17)])
+        self.assertEqual(document.find_by_selector(Linter.scope_block), [(26, 44)])
+
+    def test_headless_lint(self):
+        text = "# Title\n\n### Sub\n\n    ### code\n\nText  \n"
+        result = Linter().run(Document(text), load_settings())
+        self.assertEqual(
+            format_result(text, result),
+            [
+                "line 3: MD001 - Header levels should only increment by one level at a time, expected 2, 3 found",
+                "line 7: MD009 - Trailing spaces, 2 spaces",
+            ],
+        )
+
+    def assertIncrementalEqual(self, *texts):
+        """
+        Lint `texts` as consecutive versions of a document incrementally and from scratch.
+        """
+        linter = Linter()
+        settings = load_settings()
+        for change_count, text in enumerate(texts):
+            document = Document(text)
+            document.change_count = change_count
+            self.assertEqual(
+                format_result(text, linter.run(document, settings, incremental=True)),
+                format_result(text, Linter().run(Document(text), settings)),
+                "version %d:\n%s" % (change_count, text),
+            )
+
+    text = (
+        "# Title\n\n"
+        "### Sub\n"
+        "Text  \n\n\n"
+        "* item\n"
+        "+ other\n\n"
+        "    code\n\n"
+        "1. one\n"
+        "1. two\n\n"
+        "## Sub\n\n"
+        "Text\n"
+    )
+
+    def test_incremental_blank_lines(self):
+        texts = [self.text]
+        # merge and split blocks by removing and inserting blank lines one at a time
+        for pos in [i for i, c in enumerate(self.text) if c == "\n"]:
+            if self.text[pos - 1] == "\n":
+                texts.append(self.text[:pos] + self.text[pos + 1 :])
+            else:
+                texts.append(self.text[:pos] + "\n" + self.text[pos:])
+            texts.append(self.text)
+        self.assertIncrementalEqual(*texts)
+
+    def test_incremental_frontmatter(self):
+        frontmatter = "---\ntitle: x\n---\n"
+        self.assertIncrementalEqual(
+            self.text,
+            frontmatter + self.text,
+            frontmatter.replace("x", "# Title") + self.text,
+            frontmatter[:-4] + self.text,
+            frontmatter + "\n" + self.text,
+            self.text,
+        )
+
+    def test_incremental_unclosed_fence(self):
+        pos = self.text.index("* item")
+        opened = self.text[:pos] + "```\n" + self.text[pos:]
+        self.assertIncrementalEqual(
+            self.text,
+            opened,
+            opened + "```\n",
+            opened,
+            self.text,
+            self.text + "\n~~~\n# Code\n",
+            self.text,
+        )
+
+
+class TestMdlConfig(unittest.TestCase):
+
+    def test_config_file_stats(self):
+        fd, config = tempfile.mkstemp(prefix="mdlrc")
+        os.close(fd)
+        self.addCleanup(os.remove, config)
+        missing = config + ".missing"
+
+        stats = config_file_stats(["-c", config, "--style=" + missing])
+        self.assertEqual([stat[0] for stat in stats], [config, missing])
+        self.assertIsNotNone(stats[0][1])
+        self.assertIsNone(stats[1][1])
+
+        with open(config, "w") as f:
+            f.write("style 'custom'\n")
+        self.assertNotEqual(config_file_stats(["-c", config]), stats[:1])
+
+        self.assertEqual(
+            [stat[0] for stat in config_file_stats([])], [os.path.expanduser("~/.mdlrc")]
+        )
@@ -0,0 +1,63 @@
+import sublime
+
+from MarkdownEditing.tests import DereferrablePanelTestCase
+
+
+class TestMdeReferenceCleanupCommand(DereferrablePanelTestCase):
+
+    def test_cleanup(self):
+        self.setBlockText(
+            """
+            # Title
+
+            [Foo][] and [Bar][] with a footnote[^1].
+
+            [foo]: https://foo.com
+            [old]: https://old.com
+            [^1]: A footnote.
+            [^2]: An unused footnote.
+
+                Its second paragraph.
+            """
+        )
+        self.view.run_command("mde_reference_cleanup")
+        self.assertEqualText(
+            "# Title\n\n[Foo][] and [Bar][] with a footnote[^1].\n\n"
+            "[foo]: https://foo.com\n"
+            "[^1]: A footnote.\n"
+            "[Bar]: \n"
+        )
+        self.assertEqual(list(self.view.sel()), [sublime.Region(99, 99)])
+
+        self.view.run_command("undo")
+        self.assertEqualBlockText(
+            """
+            # Title
+
+            [Foo][] and [Bar][] with a footnote[^1].
+
+            [foo]: https://foo.com
+            [old]: https://old.com
+            [^1]: A footnote.
+            [^2]: An unused footnote.
+
+                Its second paragraph.
+            """
+        )
+
+    def test_nothing_to_clean(self):
+        self.setBlockText(
+            """
+            [Foo][]
+
+            [foo]: https://foo.com
+            """
+        )
+        self.view.run_command("mde_reference_cleanup")
+        self.assertEqualBlockText(
+            """
+            [Foo][]
+
+            [foo]: https://foo.com
+            """
+        )
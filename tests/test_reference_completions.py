@@ -50,3 +50,39 @@ class TestReferenceCompletions(DereferrablePanelTestCase):
         provider = MdeReferenceCompletionsProvider(self.view)
         completion_list = provider.on_query_completions("", [34])
         self.assertEqual(completion_list.completions, expected_items)
+
+
+class TestReferenceCompletionsRanking(DereferrablePanelTestCase):
+
+    def ids(self, completion_list):
+        if hasattr(sublime, "KIND_ID_MARKUP"):
+            return [item.trigger for item in completion_list.completions]
+        return [item[1] for item in completion_list[0]]
+
+    def test_ranked_by_usage(self):
+        self.setBlockText(
+            """
+            [a][rare] and [b][often] and [c][often] and [d][]
+
+            [rare]: https://rare.com
+            [d]: https://d.com
+            [often]: https://often.com
+            """
+        )
+        provider = MdeReferenceCompletionsProvider(self.view)
+        self.assertEqual(self.ids(provider.on_query_completions("", [1])), ["often", "rare", "d"])
+
+    def test_cached(self):
+        self.setText("[a][x]\n\n[x]: https://x.com\n")
+        provider = MdeReferenceCompletionsProvider(self.view)
+        self.assertEqual(self.ids(provider.on_query_completions("", [1])), ["x"])
+        completions = provider.completions
+        self.assertEqual(self.ids(provider.on_query_completions("", [1])), ["x"])
+        self.assertIs(provider.completions, completions)
+
+    def test_updated_before_query(self):
+        self.setText("[a][x]\n\n[x]: https://x.com\n")
+        provider = MdeReferenceCompletionsProvider(self.view)
+        self.assertEqual(self.ids(provider.on_query_completions("", [1])), ["x"])
+        self.setText("[a][y]\n\n[x]: https://x.com\n[y]: https://y.com\n")
+        self.assertEqual(self.ids(provider.on_query_completions("", [1])), ["y", "x"])
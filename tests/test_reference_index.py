@@ -0,0 +1,84 @@
+import sublime
+
+from MarkdownEditing.tests import DereferrablePanelTestCase
+from MarkdownEditing.plugins.reference_index import ReferenceIndex, ScopeIndex
+
+
+class TestReferenceIndex(DereferrablePanelTestCase):
+
+    def setUp(self):
+        self.setBlockText(
+            """
+            # Title
+
+            Text [Foo][] and [bar text][Bar] with a footnote[^1].
+
+            [foo]: https://foo.com
+            [Bar]: <https://bar.com>
+            [^1]: A footnote.
+            """
+        )
+
+    def regions(self, entry):
+        return [(r.begin(), r.end()) for r in entry.regions]
+
+    def test_index(self):
+        index = ReferenceIndex.get(self.view)
+        self.assertEqual(sorted(index.definitions), ["^1", "bar", "foo"])
+        self.assertEqual(sorted(index.markers), ["^1", "bar", "foo"])
+        self.assertEqual(sorted(index.footnotes), ["^1"])
+        self.assertEqual(index.links, {"foo": "https://foo.com", "Bar": "https://bar.com"})
+        self.assertEqual(self.regions(index.markers["foo"]), [(15, 18)])
+        self.assertEqual(index.definitions["bar"].label, "Bar")
+
+    def test_update(self):
+        index = ReferenceIndex.get(self.view)
+        self.assertIs(ReferenceIndex.get(self.view).markers, index.markers)
+
+        self.setCaretTo(3, 1)
+        self.view.run_command("insert", {"characters": "[Baz][] "})
+        index = ReferenceIndex.get(self.view)
+        self.assertEqual(sorted(index.markers), ["^1", "bar", "baz", "foo"])
+        self.assertEqual(self.regions(index.markers["foo"]), [(23, 26)])
+        self.assertEqual(
+            self.view.substr(sublime.Region(*self.regions(index.definitions["foo"])[0])), "foo"
+        )
+
+    def test_scope_index(self):
+        index = ScopeIndex.get(self.view)
+        self.assertEqual(index.extent(65), sublime.Region(65, 68))
+        self.assertEqual(index.extent(66), sublime.Region(65, 68))
+        self.assertEqual(index.find(64, "entity.name.reference.link.markdown"), 65)
+        self.assertEqual(index.find(71, "entity.name.reference.link.markdown", backwards=True), 67)
+        self.assertEqual(index.find(71, "markup.underline.link.markdown", char="h"), 72)
+
+    def test_preview(self):
+        index = ReferenceIndex.get(self.view)
+        self.assertEqual(index.preview("foo"), ("https://foo.com", None))
+        self.assertEqual(index.preview("bar"), ("https://bar.com", None))
+        self.assertEqual(index.preview("^1"), "A footnote.")
+        self.assertIsNone(index.preview("baz"))
+
+    def test_preview_skips_code(self):
+        self.setBlockText(
+            """
+            Text [foo][].
+
+            ```
+            [foo]: https://code.com
+            ```
+
+            [foo]: https://foo.com
+            """
+        )
+        index = ReferenceIndex.get(self.view)
+        self.assertEqual(index.preview("foo"), ("https://foo.com", None))
+
+    def test_duplicate_links(self):
+        self.setBlockText(
+            """
+            [foo]: https://first.com
+            [foo]: https://second.com
+            """
+        )
+        self.assertEqual(ReferenceIndex.get(self.view).links, {"foo": "https://first.com"})
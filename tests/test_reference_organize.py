@@ -0,0 +1,49 @@
+import sublime
+
+from MarkdownEditing.tests import DereferrablePanelTestCase
+
+
+class TestMdeReferenceOrganizeCommand(DereferrablePanelTestCase):
+
+    def test_organize(self):
+        self.setBlockText(
+            """
+            # Title
+
+            [Foo][] and [Bar][].
+
+            [bar]: https://bar.com
+            [foo]: https://foo.com
+            [foo]: https://foo.com
+            """
+        )
+        self.view.run_command("mde_reference_organize")
+        self.assertEqualText(
+            "# Title\n\n[Foo][] and [Bar][].\n\n"
+            "[foo]: https://foo.com\n"
+            "[foo]: https://foo.com\n"
+            "[bar]: https://bar.com\n"
+        )
+        self.assertEqual(list(self.view.sel()), [sublime.Region(54, 77)])
+
+        panel = self.window.find_output_panel("mde")
+        self.assertEqual(
+            panel.substr(sublime.Region(0, panel.size())),
+            "foo has duplicate value of https://foo.com\n"
+            "===================\n"
+            "[Foo] is referenced 1 time\n"
+            "[Bar] is referenced 1 time"
+        )
+
+        self.view.run_command("undo")
+        self.assertEqualBlockText(
+            """
+            # Title
+
+            [Foo][] and [Bar][].
+
+            [bar]: https://bar.com
+            [foo]: https://foo.com
+            [foo]: https://foo.com
+            """
+        )
@@ -0,0 +1,107 @@
+import http.server
+import socketserver
+import threading
+import unittest
+
+from MarkdownEditing.plugins.url_check import CONNECTION_FAILED, UrlChecker, is_broken
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.path))
+        if self.path == "/no-head":
+            self.respond(405)
+        elif self.path == "/moved":
+            self.respond(301, {"Location": "/ok"})
+        elif self.path in ("/ok", "/ok?q=1"):
+            self.respond(200)
+        else:
+            self.respond(404)
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        self.respond(200 if self.path == "/no-head" else 404)
+
+    def respond(self, status, headers={}):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+
+    daemon_threads = True
+
+
+class TestUrlChecker(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_check(self):
+        checker = UrlChecker(workers=4, timeout=5)
+        urls = [self.base + path for path in ("/ok", "/ok", "/missing", "/moved", "/no-head")]
+        result = checker.check(urls + ["mailto:someone@example.com", "relative/path.md"])
+        self.assertEqual(
+            {url[len(self.base) :]: status for url, (status, _) in result.items()},
+            {"/ok": 200, "/missing": 404, "/moved": 200, "/no-head": 200},
+        )
+        self.assertEqual(self.server.requests.count(("HEAD", "/ok")), 2)
+        self.assertIn(("GET", "/no-head"), self.server.requests)
+
+        # statuses are cached
+        count = len(self.server.requests)
+        checker.check(urls)
+        self.assertEqual(len(self.server.requests), count)
+
+        # until they expire
+        checker.ttl = 0
+        checker.check([self.base + "/ok?q=1", self.base + "/ok"])
+        self.assertEqual(
+            sorted(self.server.requests[count:]), [("HEAD", "/ok"), ("HEAD", "/ok?q=1")]
+        )
+
+    def test_connection_failed(self):
+        checker = UrlChecker(timeout=5)
+        self.server.shutdown()
+        self.server.server_close()
+        status, _ = checker.check([self.base + "/ok"])[self.base + "/ok"]
+        self.assertEqual(status, CONNECTION_FAILED)
+        self.assertTrue(is_broken(status))
+        self.assertTrue(is_broken(404))
+        self.assertFalse(is_broken(200))
+
+    def test_non_ascii_url(self):
+        checker = UrlChecker(timeout=5)
+        urls = [self.base + "/ok", self.base + "/\u00fc?q=\u00e4 b", "http://h\u00f6st\x00/"]
+        result = checker.check(urls)
+        self.assertEqual(result[urls[0]][0], 200)
+        self.assertEqual(result[urls[1]][0], 404)
+        self.assertIn(("HEAD", "/%C3%BC?q=%C3%A4%20b"), self.server.requests)
+        self.assertEqual(result[urls[2]][0], CONNECTION_FAILED)
+        self.assertEqual(checker.pending, {})
+
+    def test_shutdown(self):
+        checker = UrlChecker(timeout=5)
+        checker.check([self.base + "/ok"])
+        self.assertEqual(len(checker.connections), 1)
+        self.assertEqual(checker.connections[0], {})
+        checker.shutdown()
+        self.assertRaises(RuntimeError, checker.pool.submit, checker.request, self.base + "/ok")
@@ -0,0 +1,30 @@
+import unittest
+
+from MarkdownEditing.plugins.urls import is_url, mangle_url, suggest_default_link_name
+
+
+class TestUrls(unittest.TestCase):
+
+    def test_is_url(self):
+        self.assertTrue(is_url("https://example.com/doc"))
+        self.assertTrue(is_url("see www.example.com"))
+        self.assertFalse(is_url("no link here"))
+
+    def test_mangle_url(self):
+        self.assertEqual(mangle_url(" example.com/doc "), "http://example.com/doc")
+        self.assertEqual(mangle_url("https://example.com"), "https://example.com")
+        self.assertEqual(mangle_url("/local/path"), "/local/path")
+
+    def test_suggest_default_link_name(self):
+        self.assertEqual(
+            suggest_default_link_name("the example (site)", "https://example.com", False),
+            "TheExampleSite",
+        )
+        self.assertEqual(suggest_default_link_name("a b", "https://example.com", True), "imageAB")
+        self.assertEqual(
+            suggest_default_link_name("ex", "https://example.com/docs/page/", False), "page"
+        )
+        self.assertEqual(
+            suggest_default_link_name("ex", "https://example.com", False), "example.com"
+        )
+        self.assertEqual(suggest_default_link_name("example", "https://x.com/y", False), "example")
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from MarkdownEditing.plugins.workspace_index import WorkspaceIndex, parse_definitions
+
+
+class TestWorkspaceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="mde")
+        self.write("links.md", "# Links\n\n[Foo]: https://foo.com\n  [bar]: <https://bar.com>\n")
+        self.write("notes.txt", "[baz]: https://baz.com\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, name, text):
+        file_name = os.path.join(self.folder, name)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name, "w", encoding="utf-8") as f:
+            f.write(text)
+        return file_name
+
+    def test_parse_definitions(self):
+        self.assertEqual(
+            parse_definitions("[a]: x\n\n> [B]: <y z>\n[^1]: note\n[a]: w\n"),
+            {"a": ("a", "x", 0, 1), "b": ("B", "y z", 2, 3)},
+        )
+
+    def test_scan(self):
+        index = WorkspaceIndex((self.folder,))
+        index.scan()
+        file_name = os.path.join(self.folder, "links.md")
+        self.assertEqual(index.definition("foo"), (file_name, "Foo", "https://foo.com", 2, 1))
+        self.assertEqual(index.name_of("https://bar.com"), "bar")
+        self.assertIsNone(index.definition("baz"))
+
+    def test_update(self):
+        index = WorkspaceIndex((self.folder,))
+        index.scan()
+        entry = index.files[os.path.join(self.folder, "links.md")]
+        index.scan()
+        self.assertIs(index.files[os.path.join(self.folder, "links.md")], entry)
+
+        file_name = self.write("more.md", "[baz]: https://baz.com\n")
+        index.update(file_name)
+        self.assertEqual(index.name_of("https://baz.com"), "baz")
+
+        os.remove(file_name)
+        index.update(file_name)
+        self.assertIsNone(index.definition("baz"))
+
+    def test_exclude(self):
+        self.write(os.path.join("node_modules", "pkg", "readme.md"), "[npm]: https://npm.com\n")
+        self.write(os.path.join(".git", "notes.md"), "[git]: https://git.com\n")
+        index = WorkspaceIndex((self.folder,), ("node_modules",))
+        index.scan()
+        self.assertEqual(sorted(index.names), ["bar", "foo"])
+
+        index.update(self.write(os.path.join("node_modules", "other.md"), "[x]: https://x.com\n"))
+        self.assertIsNone(index.definition("x"))